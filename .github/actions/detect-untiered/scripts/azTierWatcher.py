@@ -29,7 +29,10 @@
             - 'MSGRAPH_ACCESS_TOKEN'
 
 """
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import datetime
+import itertools
 import json
 import os
 import requests
@@ -38,6 +41,24 @@ import time
 import uuid
 
 
+# HTTP session ####################################################################################################################################################
+
+# A single session is shared by all requests to ARM, MS Graph and GitHub, so that connections are kept alive and reused instead of re-negotiated for each request.
+# Transient errors are retried with an exponential backoff and jitter, or after the delay advised by the 'Retry-After' header, while the final response is returned to the caller to keep the existing error handling.
+# POST requests are retried as well, as they are only used to acquire tokens and to send read-only batch requests.
+http_session = requests.Session()
+http_retry_strategy = Retry(
+    total = 6,
+    backoff_factor = 1.5,
+    backoff_jitter = 1.0,
+    status_forcelist = [429, 500, 502, 503, 504],
+    allowed_methods = frozenset(['GET', 'POST']),
+    respect_retry_after_header = True,
+    raise_on_status = False
+)
+http_session.mount('https://', HTTPAdapter(pool_connections = 32, pool_maxsize = 32, max_retries = http_retry_strategy))
+
+
 # ARM functions ###################################################################################################################################################
 
 def get_arm_access_token():
@@ -56,7 +77,7 @@ def get_arm_access_token():
     # Get Github OIDC token
     endpoint = f"{github_action_uri}&audience=api://AzureADTokenExchange"
     headers = {'Authorization': f"Bearer {github_action_token}"}
-    oidc_response = requests.get(endpoint, headers = headers)
+    oidc_response = http_session.get(endpoint, headers = headers)
     github_oidc_token = oidc_response.json()["value"]
 
     # Get ARM token
@@ -68,7 +89,7 @@ def get_arm_access_token():
         "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
         "client_assertion": github_oidc_token
     }
-    response = requests.post(endpoint, data = body)
+    response = http_session.post(endpoint, data = body)
     access_token = response.json().get("access_token")
 
     return access_token
@@ -101,7 +122,7 @@ def send_batch_request_to_arm(batch_requests):
 
         """
         try:
-            response = requests.get(request, headers = headers)
+            response = http_session.get(request, headers = headers)
             return response
         
         except requests.exceptions.RequestException as e:
@@ -191,6 +212,9 @@ def send_batch_request_to_arm(batch_requests):
         # Get a new ARM token for each chunk
         token = get_arm_access_token()
         remaining_requests = chunked_batch_request
+
+        # Requests to retry are resolved from their response name, without scanning the whole chunk for each of them
+        requests_by_name = {request['name']: request for request in chunked_batch_request}
         
         # Loop until no request is throttled
         while remaining_requests:
@@ -200,7 +224,7 @@ def send_batch_request_to_arm(batch_requests):
             body = { 
                 'requests': remaining_requests
             }
-            http_response = requests.post(endpoint, headers = headers, json = body)
+            http_response = http_session.post(endpoint, headers = headers, json = body)
             asynchronous_responses = handle_asynchronous_http_responses(http_response)
 
             # Analyze HTTP responses #######################################################################################################
@@ -255,7 +279,7 @@ def send_batch_request_to_arm(batch_requests):
             failed_responses = server_error_responses + service_unavailable_responses
             for failed_response in failed_responses:
                 failed_response_name = failed_response['name']
-                failed_request = next((r for r in chunked_batch_request if r['name'] == failed_response_name), None)
+                failed_request = requests_by_name[failed_response_name]
                 remaining_requests.append(failed_request)
 
             # 429 - Handle throttled requests
@@ -263,7 +287,7 @@ def send_batch_request_to_arm(batch_requests):
                 # Collect throttled requests for retry
                 for throttled_response in throttled_responses:
                     throttled_response_name = throttled_response['name']
-                    throttled_request = next((r for r in chunked_batch_request if r['name'] == throttled_response_name), None)
+                    throttled_request = requests_by_name[throttled_response_name]
                     remaining_requests.append(throttled_request)
                     
                 # Calculate average 'Retry-After' header value across all throttled responses
@@ -300,12 +324,16 @@ def get_resource_id_of_all_scopes_from_arm():
     all_scopes = []
 
     # Get Management groups and Subscriptions
+    mg_request_name = str(uuid.uuid4())
+    subscription_request_name = str(uuid.uuid4())
     batch_requests = [
         {
+            "name": mg_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/providers/Microsoft.Management/managementGroups?api-version=2021-04-01"
         },
         {
+            "name": subscription_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/subscriptions?api-version=2021-04-01"
         }
@@ -317,9 +345,11 @@ def get_resource_id_of_all_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    mg_responses = http_responses[0]['content']['value']
+    # Responses are matched by name, as retried requests may come back in a different order
+    http_responses_by_name = {response['name']: response for response in http_responses}
+    mg_responses = http_responses_by_name[mg_request_name]['content']['value']
     mg_resource_ids = [response['id'] for response in mg_responses]
-    subscription_responses = http_responses[1]['content']['value']
+    subscription_responses = http_responses_by_name[subscription_request_name]['content']['value']
     subscription_resource_ids = [response['id'] for response in subscription_responses]
 
     # Get Resource groups
@@ -338,7 +368,7 @@ def get_resource_id_of_all_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    rg_responses = sum([response['content']['value'] for response in http_responses], [])
+    rg_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     rg_resource_ids = [response['id'] for response in rg_responses]
 
     # Get individual resources
@@ -357,7 +387,7 @@ def get_resource_id_of_all_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    resource_responses = sum([response['content']['value'] for response in http_responses], [])
+    resource_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     resource_resource_ids = [response['id'] for response in resource_responses]
 
     # Merge all scopes
@@ -379,12 +409,16 @@ def get_resource_id_of_higher_scopes_from_arm():
     higher_scopes = []
 
     # Get Management groups and Subscriptions
+    mg_request_name = str(uuid.uuid4())
+    subscription_request_name = str(uuid.uuid4())
     batch_requests = [
         {
+            "name": mg_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/providers/Microsoft.Management/managementGroups?api-version=2021-04-01"
         },
         {
+            "name": subscription_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/subscriptions?api-version=2021-04-01"
         }
@@ -396,9 +430,11 @@ def get_resource_id_of_higher_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    mg_responses = http_responses[0]['content']['value']
+    # Responses are matched by name, as retried requests may come back in a different order
+    http_responses_by_name = {response['name']: response for response in http_responses}
+    mg_responses = http_responses_by_name[mg_request_name]['content']['value']
     mg_resource_ids = [response['id'] for response in mg_responses]
-    subscription_responses = http_responses[1]['content']['value']
+    subscription_responses = http_responses_by_name[subscription_request_name]['content']['value']
     subscription_resource_ids = [response['id'] for response in subscription_responses]
 
     # Get Resource groups
@@ -417,7 +453,7 @@ def get_resource_id_of_higher_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    rg_responses = sum([response['content']['value'] for response in http_responses], [])
+    rg_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     rg_resource_ids = [response['id'] for response in rg_responses]
 
     # Merge higher scopes
@@ -436,7 +472,7 @@ def is_pim_enabled_for_arm():
     token = get_arm_access_token()
     endpoint = 'https://management.azure.com/providers/Microsoft.Authorization/roleEligibilityScheduleInstances?$filter=asTarget()&api-version=2020-10-01'
     headers = {'Authorization': f"Bearer {token}"}
-    response = requests.get(endpoint, headers = headers)
+    response = http_session.get(endpoint, headers = headers)
 
     if response.status_code == 200:
         return True
@@ -473,10 +509,9 @@ def get_role_definition_id_of_assigned_azure_roles_within_scope_from_arm(scope):
         print('FATAL ERROR - The assigned Azure role definition Ids could not be retrieved from ARM.')
         exit()
  
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
+    assignment_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]    
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
+    unique_role_definition_ids = get_unique_role_definition_ids(role_definition_ids)
 
     return unique_role_definition_ids
 
@@ -510,10 +545,9 @@ def get_role_definition_id_of_active_azure_roles_within_scope_from_arm(scope):
         print('FATAL ERROR - The active Azure role definition Ids could not be retrieved from ARM.')
         exit()
  
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
+    assignment_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]    
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
+    unique_role_definition_ids = get_unique_role_definition_ids(role_definition_ids)
 
     return unique_role_definition_ids
 
@@ -547,10 +581,9 @@ def get_role_definition_id_of_eligible_azure_roles_within_scope_from_arm(scope):
         print('FATAL ERROR - The eligible Azure role definition Ids could not be retrieved from ARM.')
         exit()
  
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
+    assignment_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
+    unique_role_definition_ids = get_unique_role_definition_ids(role_definition_ids)
 
     return unique_role_definition_ids
 
@@ -652,7 +685,7 @@ def deprecated_get_assigned_azure_role_definitions_from_arm():
         | summarize by roleDefinitionId, roleId, roleName, roleType, roleDescription
         | order by ['roleName'] asc"""
     }
-    response = requests.post(endpoint, headers = headers, json = body)
+    response = http_session.post(endpoint, headers = headers, json = body)
 
     if response.status_code != 200:
         print('FATAL ERROR - The Azure role definitions could not be retrieved from ARM.')
@@ -673,7 +706,7 @@ def get_custom_azure_role_definitions_from_arm():
     token = get_arm_access_token()
     endpoint = "https://management.azure.com/providers/Microsoft.Authorization/roleDefinitions?$filter=type+eq+'CustomRole'&api-version=2022-04-01"
     headers = {'Authorization': f"Bearer {token}"}
-    response = requests.get(endpoint, headers = headers)
+    response = http_session.get(endpoint, headers = headers)
 
     if response.status_code != 200:
         print('FATAL ERROR - The custom Azure roles could not be retrieved from ARM.')
@@ -702,7 +735,7 @@ def get_msgraph_access_token():
     # Get Github OIDC token
     endpoint = f"{github_action_uri}&audience=api://AzureADTokenExchange"
     headers = {'Authorization': f"Bearer {github_action_token}"}
-    oidc_response = requests.get(endpoint, headers = headers)
+    oidc_response = http_session.get(endpoint, headers = headers)
     github_oidc_token = oidc_response.json()["value"]
 
     # Get MS Graph token
@@ -714,7 +747,7 @@ def get_msgraph_access_token():
         "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
         "client_assertion": github_oidc_token
     }
-    response = requests.post(endpoint, data = body)
+    response = http_session.post(endpoint, data = body)
     access_token = response.json().get("access_token")
 
     return access_token
@@ -730,7 +763,7 @@ def get_custom_entra_role_definitions_from_graph():
     token = get_msgraph_access_token()
     endpoint = 'https://graph.microsoft.com/v1.0/roleManagement/directory/roleDefinitions?$filter=isBuiltIn eq false'
     headers = {'Authorization': f"Bearer {token}"}
-    response = requests.get(endpoint, headers = headers)
+    response = http_session.get(endpoint, headers = headers)
 
     if response.status_code != 200:
         print('FATAL ERROR - The custom Entra roles could not be retrieved from Graph.')
@@ -743,6 +776,34 @@ def get_custom_entra_role_definitions_from_graph():
 
 # Helper functions ################################################################################################################################################
 
+def get_unique_role_definition_ids(role_definition_ids):
+    """
+        Removes duplicate role definition Ids, while preserving their original order.
+
+        Note:
+            Role definition Ids are considered duplicates when they share the same role Id (i.e. last segment of the definition Id),
+            as the same role may be assigned at different scopes
+        
+        Args:
+            role_definition_ids(list(str)): list of role definition Ids
+
+        Returns:
+            list(str): list of role definition Ids, with only the first occurrence of each role
+
+    """
+    unique_role_ids = set()
+    unique_role_definition_ids = []
+
+    for role_definition_id in role_definition_ids:
+        role_id = role_definition_id.rsplit('/', 1)[-1]
+
+        if role_id not in unique_role_ids:
+            unique_role_ids.add(role_id)
+            unique_role_definition_ids.append(role_definition_id)
+
+    return unique_role_definition_ids
+
+
 def find_added_assets(extended_assets, base_assets):
     """
         Compares a base list with a list of extended assets, to determine the assets that have been added to the extended list.
@@ -31,14 +31,41 @@
             - 'MSGRAPH_ACCESS_TOKEN'
 
 """
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import functools
+import hashlib
+import itertools
 import json
+import orjson
 import os
 import requests
 import sys
+import tempfile
 import time
 import uuid
 
 
+# HTTP session ####################################################################################################################################################
+
+# A single session is shared by all requests to ARM, MS Graph and GitHub, so that connections are kept alive and reused instead of re-negotiated for each request.
+# Transient errors are retried with an exponential backoff and jitter, or after the delay advised by the 'Retry-After' header, while the final response is returned to the caller to keep the existing error handling.
+# POST requests are retried as well, as they are only used to acquire tokens and to send read-only batch requests.
+http_session = requests.Session()
+http_retry_strategy = Retry(
+    total = 6,
+    backoff_factor = 1.5,
+    backoff_jitter = 1.0,
+    status_forcelist = [429, 500, 502, 503, 504],
+    allowed_methods = frozenset(['GET', 'POST']),
+    respect_retry_after_header = True,
+    raise_on_status = False
+)
+http_session.mount('https://', HTTPAdapter(pool_connections = 32, pool_maxsize = 32, max_retries = http_retry_strategy))
+
+
 # ARM functions ###################################################################################################################################################
 
 def get_arm_access_token():
@@ -57,7 +84,7 @@ def get_arm_access_token():
     # Get Github OIDC token
     endpoint = f"{github_action_uri}&audience=api://AzureADTokenExchange"
     headers = {'Authorization': f"Bearer {github_action_token}"}
-    oidc_response = requests.get(endpoint, headers = headers)
+    oidc_response = http_session.get(endpoint, headers = headers)
     github_oidc_token = oidc_response.json()["value"]
 
     # Get ARM token
@@ -69,16 +96,20 @@ def get_arm_access_token():
         "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
         "client_assertion": github_oidc_token
     }
-    response = requests.post(endpoint, data = body)
+    response = http_session.post(endpoint, data = body)
     access_token = response.json().get("access_token")
 
     return access_token
 
 
+@functools.lru_cache(maxsize = 1)
 def is_pim_enabled_for_arm():
     """
         Checks if the passed token has access to the PIM endpoints.
 
+        Note:
+            The result is cached for the lifetime of the process, as PIM availability does not change during a sync
+
         Returns:
             bool: True if PIM is enabled, False otherwise
 
@@ -86,7 +117,7 @@ def is_pim_enabled_for_arm():
     token = get_arm_access_token()
     endpoint = 'https://management.azure.com/providers/Microsoft.Authorization/roleEligibilityScheduleInstances?$filter=asTarget()&api-version=2020-10-01'
     headers = {'Authorization': f"Bearer {token}"}
-    response = requests.get(endpoint, headers = headers)
+    response = http_session.get(endpoint, headers = headers)
 
     if response.status_code == 200:
         return True
@@ -121,7 +152,7 @@ def send_batch_request_to_arm(batch_requests):
 
         """
         try:
-            response = requests.get(request, headers = headers)
+            response = http_session.get(request, headers = headers)
             return response
         
         except requests.exceptions.RequestException as e:
@@ -133,12 +164,34 @@ def send_batch_request_to_arm(batch_requests):
             return response
 
 
-    def handle_asynchronous_http_responses(http_response):
+    def get_retry_after_seconds(http_response):
+        """
+            Retrieves the number of seconds to wait before checking the status of an asynchronous response again, as advised by ARM.
+
+            Args:
+                http_response(requests.models.Response): the HTTP response from ARM
+
+            Returns:
+                int: the number of seconds to wait, between 1 and 20 seconds
+
+        """
+        default_wait_time = 2
+
+        try:
+            retry_after_x_seconds = int(http_response.headers.get('Retry-After', default_wait_time))
+        except ValueError:
+            retry_after_x_seconds = default_wait_time
+
+        return max(1, min(retry_after_x_seconds, 20))
+
+
+    def handle_asynchronous_http_responses(http_response, headers):
         """
             Handles asynchronous HTTP responses from ARM, including pagination.
 
             Args:
                 http_response(requests.models.Response): the HTTP response from ARM
+                headers(dict): the headers to include in the HTTP requests retrieving the asynchronous response
 
             Returns:
                 list(dict): list of responses from ARM
@@ -148,13 +201,12 @@ def send_batch_request_to_arm(batch_requests):
 
         if http_response.status_code == 202:
             # Responses are processed asynchronously and served paginated
-            retry_after_x_seconds = int(http_response.headers.get('Retry-After'))
+            page = http_response.headers.get('Location')
             page_response = http_response
 
             while page_response.status_code == 202:
-                # Check status periodically until the response is ready
-                time.sleep(retry_after_x_seconds) 
-                page = http_response.headers.get('Location')
+                # Check status periodically until the response is ready, as advised by the last response
+                time.sleep(get_retry_after_seconds(page_response))
                 page_response = send_http_get_request(page, headers = headers)
 
             if page_response.status_code != 200:
@@ -163,9 +215,9 @@ def send_batch_request_to_arm(batch_requests):
                 return None
 
             # The response is ready
-            paginated_response = page_response.json()['value']
-            all_responses += paginated_response
-            next_page = page_response.json()['nextLink'] if 'nextLink' in page_response.json() else ''
+            page_content = orjson.loads(page_response.content)
+            all_responses += page_content['value']
+            next_page = page_content.get('nextLink', '')
 
             while next_page:
                 # There are more pages to retrieve                    
@@ -173,24 +225,28 @@ def send_batch_request_to_arm(batch_requests):
 
                 while next_page_response.status_code == 202:
                     # The next page is not ready yet, wait and retry
-                    time.sleep(retry_after_x_seconds)
+                    time.sleep(get_retry_after_seconds(next_page_response))
+                    next_page_response = send_http_get_request(next_page, headers = headers)
 
                 # The next page is ready
-                all_responses += next_page_response.json()['value']
-                next_page = next_page_response.json()['nextLink'] if 'nextLink' in next_page_response.json() else ''
+                next_page_content = orjson.loads(next_page_response.content)
+                all_responses += next_page_content['value']
+                next_page = next_page_content.get('nextLink', '')
 
         elif http_response.status_code == 200:
-            # The response is synchronous and ready
-            if 'responses' in http_response.json():
+            # The response is synchronous and ready, and is decoded only once as batch responses can be large
+            response_content = orjson.loads(http_response.content)
+
+            if 'responses' in response_content:
                 # The response is a multi-paginated response
-                return http_response.json()['responses']
+                return response_content['responses']
             
-            elif 'value' in http_response.json():
+            elif 'value' in response_content:
                 # The response is a single-paginated response
-                return http_response.json()['value']
+                return response_content['value']
             
             # The response is a single non-paginated response
-            return http_response.json()
+            return response_content
         
         else:
             # The response has failed and there is a problem with the API
@@ -199,17 +255,26 @@ def send_batch_request_to_arm(batch_requests):
 
         return all_responses
 
-    # Main function logic
-    complete_response = []
 
-    # Divide the passed batch into smaller chunks to stay within API limits
-    batch_request_size_limit = 500
-    chunked_batch_requests = [batch_requests[i:i + batch_request_size_limit] for i in range(0, len(batch_requests), batch_request_size_limit)]
-    
-    for chunked_batch_request in chunked_batch_requests:
+    def send_chunked_batch_request(chunked_batch_request):
+        """
+            Sends the passed chunk of batch requests to ARM, and retries the requests that have been throttled or have failed due to server errors.
+
+            Args:
+                chunked_batch_request(list(dict)): chunk of batch requests to send to ARM, within the API limits
+
+            Returns:
+                list(dict): list of successful responses from ARM
+
+        """
+        chunk_response = []
+
         # Get a new ARM token for each chunk
         token = get_arm_access_token()
         remaining_requests = chunked_batch_request
+
+        # Requests to retry are resolved from their response name, without scanning the whole chunk for each of them
+        requests_by_name = {request['name']: request for request in chunked_batch_request}
         
         # Loop until no request is throttled
         while remaining_requests:
@@ -219,14 +284,14 @@ def send_batch_request_to_arm(batch_requests):
             body = { 
                 'requests': remaining_requests
             }
-            http_response = requests.post(endpoint, headers = headers, json = body)
-            asynchronous_responses = handle_asynchronous_http_responses(http_response)
+            http_response = http_session.post(endpoint, headers = headers, json = body)
+            asynchronous_responses = handle_asynchronous_http_responses(http_response, headers)
 
             # Analyze HTTP responses #######################################################################################################
 
             # 200 - Identify successful requests
             successful_responses = [response for response in asynchronous_responses if response['httpStatusCode'] == 200]
-            complete_response += successful_responses
+            chunk_response += successful_responses
 
             # 429 - Identify throttled requests
             throttled_responses = [response for response in asynchronous_responses if response['httpStatusCode'] == 429]
@@ -274,7 +339,7 @@ def send_batch_request_to_arm(batch_requests):
             failed_responses = server_error_responses + service_unavailable_responses
             for failed_response in failed_responses:
                 failed_response_name = failed_response['name']
-                failed_request = next((r for r in chunked_batch_request if r['name'] == failed_response_name), None)
+                failed_request = requests_by_name[failed_response_name]
                 remaining_requests.append(failed_request)
 
             # 429 - Handle throttled requests
@@ -282,7 +347,7 @@ def send_batch_request_to_arm(batch_requests):
                 # Collect throttled requests for retry
                 for throttled_response in throttled_responses:
                     throttled_response_name = throttled_response['name']
-                    throttled_request = next((r for r in chunked_batch_request if r['name'] == throttled_response_name), None)
+                    throttled_request = requests_by_name[throttled_response_name]
                     remaining_requests.append(throttled_request)
                     
                 # Calculate average 'Retry-After' header value across all throttled responses
@@ -294,9 +359,22 @@ def send_batch_request_to_arm(batch_requests):
                 # Sleep for the average 'Retry-After' duration before retrying
                 print(f"Throttled request - Sleep for: {avg_retry_after} seconds")
                 time.sleep(avg_retry_after)
-        
-        #print (f"DEBUG - End of While: {len(complete_response)}")
-        # End of While
+
+        return chunk_response
+
+    # Main function logic
+    complete_response = []
+
+    # Divide the passed batch into smaller chunks to stay within API limits
+    batch_request_size_limit = 500
+    chunked_batch_requests = [batch_requests[i:i + batch_request_size_limit] for i in range(0, len(batch_requests), batch_request_size_limit)]
+
+    # Chunks are independent from each other, so a few of them are sent concurrently while others wait for their asynchronous responses
+    max_concurrent_chunks = 8
+
+    with ThreadPoolExecutor(max_workers = max(1, min(max_concurrent_chunks, len(chunked_batch_requests)))) as executor:
+        for chunk_response in executor.map(send_chunked_batch_request, chunked_batch_requests):
+            complete_response += chunk_response
 
     #print (f"DEBUG - Number of batch requests: {len(batch_requests)}")
     #print (f"DEBUG - Number of batch responses: {len(complete_response)}")
@@ -304,6 +382,7 @@ def send_batch_request_to_arm(batch_requests):
     return complete_response
 
 
+@functools.lru_cache(maxsize = 1)
 def get_resource_id_of_all_scopes_from_arm():
     """
         Retrieves the resource Id of all scopes in the tenant:
@@ -312,6 +391,9 @@ def get_resource_id_of_all_scopes_from_arm():
             - Resource groups
             - Individual resources
 
+        Note:
+            The result is cached for the lifetime of the process, as enumerating all scopes is expensive
+
         Returns:
             list(str): list of resource Ids for all scopes in the tenant
 
@@ -319,12 +401,16 @@ def get_resource_id_of_all_scopes_from_arm():
     all_scopes = []
 
     # Get Management groups and Subscriptions
+    mg_request_name = str(uuid.uuid4())
+    subscription_request_name = str(uuid.uuid4())
     batch_requests = [
         {
+            "name": mg_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/providers/Microsoft.Management/managementGroups?api-version=2021-04-01"
         },
         {
+            "name": subscription_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/subscriptions?api-version=2021-04-01"
         }
@@ -336,54 +422,83 @@ def get_resource_id_of_all_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    mg_responses = http_responses[0]['content']['value']
+    # Responses are matched by name, as retried requests may come back in a different order
+    http_responses_by_name = {response['name']: response for response in http_responses}
+    mg_responses = http_responses_by_name[mg_request_name]['content']['value']
     mg_resource_ids = [response['id'] for response in mg_responses]
-    subscription_responses = http_responses[1]['content']['value']
+    subscription_responses = http_responses_by_name[subscription_request_name]['content']['value']
     subscription_resource_ids = [response['id'] for response in subscription_responses]
 
-    # Get Resource groups
-    batch_requests = []
+    def get_resource_id_of_scopes_within_subscription(subscription_resource_id):
+        """
+            Retrieves the resource Id of all Resource groups and individual resources within the passed subscription.
 
-    for subscription_resource_id in subscription_resource_ids:
-        batch_requests.append({
-            "name": str(uuid.uuid4()),
-            "httpMethod": "GET",
-            "url": f"https://management.azure.com{subscription_resource_id}/resourceGroups?api-version=2021-04-01"
-        })
+            Args:
+                subscription_resource_id(str): the resource Id of the subscription to enumerate
 
-    http_responses = send_batch_request_to_arm(batch_requests)
-    
-    if http_responses is None:
-        print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
-        exit()
+            Returns:
+                list(str): list of resource Ids for Resource groups within the subscription
+                list(str): list of resource Ids for individual resources within the subscription
 
-    rg_responses = sum([response['content']['value'] for response in http_responses], [])
-    rg_resource_ids = [response['id'] for response in rg_responses]
+        """
+        # Get Resource groups
+        batch_requests = [
+            {
+                "name": str(uuid.uuid4()),
+                "httpMethod": "GET",
+                "url": f"https://management.azure.com{subscription_resource_id}/resourceGroups?api-version=2021-04-01"
+            }
+        ]
 
-    # Get individual resources
-    batch_requests = []
+        http_responses = send_batch_request_to_arm(batch_requests)
+        
+        if http_responses is None:
+            print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
+            exit()
 
-    for rg_resource_id in rg_resource_ids:
-        batch_requests.append({
-            "name": str(uuid.uuid4()),
-            "httpMethod": "GET",
-            "url": f"https://management.azure.com{rg_resource_id}/resources?api-version=2021-04-01"
-        })
+        rg_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
+        rg_resource_ids = [response['id'] for response in rg_responses]
 
-    http_responses = send_batch_request_to_arm(batch_requests)
+        # Get individual resources
+        batch_requests = []
 
-    if http_responses is None:
-        print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
-        exit()
+        for rg_resource_id in rg_resource_ids:
+            batch_requests.append({
+                "name": str(uuid.uuid4()),
+                "httpMethod": "GET",
+                "url": f"https://management.azure.com{rg_resource_id}/resources?api-version=2021-04-01"
+            })
+
+        if not batch_requests:
+            return rg_resource_ids, []
+
+        http_responses = send_batch_request_to_arm(batch_requests)
+
+        if http_responses is None:
+            print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
+            exit()
+
+        resource_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
+        resource_resource_ids = [response['id'] for response in resource_responses]
+
+        return rg_resource_ids, resource_resource_ids
 
-    resource_responses = sum([response['content']['value'] for response in http_responses], [])
-    resource_resource_ids = [response['id'] for response in resource_responses]
+    # Subscriptions are enumerated concurrently, so that the resources of a subscription are requested as soon as its Resource groups are known, without waiting for other subscriptions
+    rg_resource_ids = []
+    resource_resource_ids = []
+    max_concurrent_subscriptions = 8
+
+    with ThreadPoolExecutor(max_workers = max(1, min(max_concurrent_subscriptions, len(subscription_resource_ids)))) as executor:
+        for subscription_rg_resource_ids, subscription_resource_resource_ids in executor.map(get_resource_id_of_scopes_within_subscription, subscription_resource_ids):
+            rg_resource_ids += subscription_rg_resource_ids
+            resource_resource_ids += subscription_resource_resource_ids
 
     # Merge all scopes
     all_scopes = mg_resource_ids + subscription_resource_ids + rg_resource_ids + resource_resource_ids
     return all_scopes
 
 
+@functools.lru_cache(maxsize = 1)
 def get_resource_id_of_higher_scopes_from_arm():
     """
         Retrieves the resource Id of higher scopes in the tenant:
@@ -391,6 +506,9 @@ def get_resource_id_of_higher_scopes_from_arm():
             - Subscriptions
             - Resource groups
 
+        Note:
+            The result is cached for the lifetime of the process, as enumerating all scopes is expensive
+
         Returns:
             list(str): list of resource Ids for higher scopes in the tenant
 
@@ -398,12 +516,16 @@ def get_resource_id_of_higher_scopes_from_arm():
     higher_scopes = []
 
     # Get Management groups and Subscriptions
+    mg_request_name = str(uuid.uuid4())
+    subscription_request_name = str(uuid.uuid4())
     batch_requests = [
         {
+            "name": mg_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/providers/Microsoft.Management/managementGroups?api-version=2021-04-01"
         },
         {
+            "name": subscription_request_name,
             "httpMethod": "GET",
             "url": "https://management.azure.com/subscriptions?api-version=2021-04-01"
         }
@@ -415,9 +537,11 @@ def get_resource_id_of_higher_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    mg_responses = http_responses[0]['content']['value']
+    # Responses are matched by name, as retried requests may come back in a different order
+    http_responses_by_name = {response['name']: response for response in http_responses}
+    mg_responses = http_responses_by_name[mg_request_name]['content']['value']
     mg_resource_ids = [response['id'] for response in mg_responses]
-    subscription_responses = http_responses[1]['content']['value']
+    subscription_responses = http_responses_by_name[subscription_request_name]['content']['value']
     subscription_resource_ids = [response['id'] for response in subscription_responses]
 
     # Get Resource groups
@@ -436,7 +560,7 @@ def get_resource_id_of_higher_scopes_from_arm():
         print('FATAL ERROR - The Azure scopes could not be retrieved from ARM.')
         exit()
 
-    rg_responses = sum([response['content']['value'] for response in http_responses], [])
+    rg_responses = itertools.chain.from_iterable(response['content']['value'] for response in http_responses)
     rg_resource_ids = [response['id'] for response in rg_responses]
 
     # Merge higher scopes
@@ -444,49 +568,69 @@ def get_resource_id_of_higher_scopes_from_arm():
     return higher_scopes
 
 
-def get_role_definition_id_of_assigned_azure_roles_within_scope_from_arm(scope):
+def get_role_definition_id_of_azure_roles_within_scope_from_arm(scope, assignment_types):
     """
-        Retrieves the definition Id of all assigned Azure roles within the passed scope.
+        Retrieves the definition Id of all Azure roles within the passed scope, for each of the passed assignment types.
 
         Note:
-            Uses the traditional role-assignment endpoint for tenants without PIM 
-         
+            All assignment types are retrieved with a single batch of requests, so that chunking and throttling are handled once for all of them.
+            Supported assignment types:
+                - 'roleAssignments': assigned roles, using the traditional role-assignment endpoint for tenants without PIM
+                - 'roleAssignmentScheduleInstances': active roles, using PIM endpoints which require an Entra Premium 2 license
+                - 'roleEligibilityScheduleInstances': eligible roles, using PIM endpoints which require an Entra Premium 2 license
+
         Args:
             scope(list(str)): list of resource Ids to check for existing role assignments
+            assignment_types(tuple(str)): the assignment types to retrieve
 
         Returns:
-            list(str): list of role definition Ids
+            dict(str:list(str)): list of role definition Ids for each assignment type
 
     """
+    api_versions = {
+        'roleAssignments': '2022-04-01',
+        'roleAssignmentScheduleInstances': '2020-10-01',
+        'roleEligibilityScheduleInstances': '2020-10-01'
+    }
     batch_requests = []
+    assignment_type_by_request_name = {}
 
-    for resource_id in scope:
-        batch_requests.append({
-            "httpMethod": "GET",
-            "name": str(uuid.uuid4()),
-            "url": f"https://management.azure.com{resource_id}/providers/Microsoft.Authorization/roleAssignments?api-version=2022-04-01&$filter=atScope()"
-        })
+    for assignment_type in assignment_types:
+        api_version = api_versions[assignment_type]
+
+        for resource_id in scope:
+            request_name = str(uuid.uuid4())
+            assignment_type_by_request_name[request_name] = assignment_type
+            batch_requests.append({
+                "httpMethod": "GET",
+                "name": request_name,
+                "url": f"https://management.azure.com{resource_id}/providers/Microsoft.Authorization/{assignment_type}?api-version={api_version}&$filter=atScope()"
+            })
 
     http_responses = send_batch_request_to_arm(batch_requests)
 
     if http_responses is None:
-        print('FATAL ERROR - The assigned Azure role definition Ids could not be retrieved from ARM.')
+        print('FATAL ERROR - The Azure role definition Ids in use could not be retrieved from ARM.')
         exit()
- 
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
-    role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]    
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
+
+    # Responses are split back by assignment type, based on the name of their request
+    role_definition_ids = {assignment_type: [] for assignment_type in assignment_types}
+
+    for response in http_responses:
+        assignment_type = assignment_type_by_request_name[response['name']]
+        role_definition_ids[assignment_type] += [assignment['properties']['roleDefinitionId'] for assignment in response['content']['value']]
+
+    unique_role_definition_ids = {assignment_type: get_unique_role_definition_ids(ids) for assignment_type, ids in role_definition_ids.items()}
 
     return unique_role_definition_ids
 
 
-def get_role_definition_id_of_active_azure_roles_within_scope_from_arm(scope):
+def get_role_definition_id_of_assigned_azure_roles_within_scope_from_arm(scope):
     """
-        Retrieves the definition Id of all active Azure roles within the passed scope.
-        
+        Retrieves the definition Id of all assigned Azure roles within the passed scope.
+
         Note:
-            Uses PIM endpoints, which requires an Entra Premium 2 license 
+            Uses the traditional role-assignment endpoint for tenants without PIM 
          
         Args:
             scope(list(str)): list of resource Ids to check for existing role assignments
@@ -495,27 +639,24 @@ def get_role_definition_id_of_active_azure_roles_within_scope_from_arm(scope):
             list(str): list of role definition Ids
 
     """
-    batch_requests = []
+    return get_role_definition_id_of_azure_roles_within_scope_from_arm(scope, ('roleAssignments',))['roleAssignments']
 
-    for resource_id in scope:
-        batch_requests.append({
-            "httpMethod": "GET",
-            "name": str(uuid.uuid4()),
-            "url": f"https://management.azure.com{resource_id}/providers/Microsoft.Authorization/roleAssignmentScheduleInstances?api-version=2020-10-01&$filter=atScope()"
-        })
 
-    http_responses = send_batch_request_to_arm(batch_requests)
+def get_role_definition_id_of_active_azure_roles_within_scope_from_arm(scope):
+    """
+        Retrieves the definition Id of all active Azure roles within the passed scope.
+        
+        Note:
+            Uses PIM endpoints, which requires an Entra Premium 2 license 
+         
+        Args:
+            scope(list(str)): list of resource Ids to check for existing role assignments
 
-    if http_responses is None:
-        print('FATAL ERROR - The active Azure role definition Ids could not be retrieved from ARM.')
-        exit()
- 
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
-    role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]    
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
+        Returns:
+            list(str): list of role definition Ids
 
-    return unique_role_definition_ids
+    """
+    return get_role_definition_id_of_azure_roles_within_scope_from_arm(scope, ('roleAssignmentScheduleInstances',))['roleAssignmentScheduleInstances']
 
 
 def get_role_definition_id_of_eligible_azure_roles_within_scope_from_arm(scope):
@@ -532,33 +673,20 @@ def get_role_definition_id_of_eligible_azure_roles_within_scope_from_arm(scope):
             list(str): list of role definition Ids
 
     """
-    batch_requests = []
+    return get_role_definition_id_of_azure_roles_within_scope_from_arm(scope, ('roleEligibilityScheduleInstances',))['roleEligibilityScheduleInstances']
 
-    for resource_id in scope:
-        batch_requests.append({
-            "httpMethod": "GET",
-            "name": str(uuid.uuid4()),
-            "url": f"https://management.azure.com{resource_id}/providers/Microsoft.Authorization/roleEligibilityScheduleInstances?api-version=2020-10-01&$filter=atScope()"
-        })
 
-    http_responses = send_batch_request_to_arm(batch_requests)
-
-    if http_responses is None:
-        print('FATAL ERROR - The eligible Azure role definition Ids could not be retrieved from ARM.')
-        exit()
- 
-    assignment_responses = sum([response['content']['value'] for response in http_responses], [])
-    role_definition_ids = [response['properties']['roleDefinitionId'] for response in assignment_responses]
-    unique_role_ids = set()
-    unique_role_definition_ids = [role_definition_id for role_definition_id in role_definition_ids if role_definition_id.split("/")[-1] not in unique_role_ids and not unique_role_ids.add(role_definition_id.split("/")[-1])]
-
-    return unique_role_definition_ids
+# Retrieved Azure role definitions are kept in memory by role Id, as the same role is typically assigned at many scopes
+azure_role_definition_cache = {}
 
 
 def get_all_azure_role_definitions_from_arm(role_definition_ids):
     """
         Retrieves the definition of all built-in and custom Azure roles with the passed definition Ids.
 
+        Note:
+            Definition Ids of the same role are only requested once, and definitions retrieved earlier in the process are served from memory
+
         Args:
             role_definition_ids(list): list of role definition Ids to check for existing role assignments
 
@@ -566,32 +694,44 @@ def get_all_azure_role_definitions_from_arm(role_definition_ids):
             list(str): list of resource Ids for all scopes that the token has access to
 
     """
-    all_role_definitions = []
     batch_requests = []
+    role_id_by_request_name = {}
+    unique_role_definition_ids = get_unique_role_definition_ids(role_definition_ids)
+    role_ids = [role_definition_id.rsplit('/', 1)[-1] for role_definition_id in unique_role_definition_ids]
 
-    for role_definition_id in role_definition_ids:
+    for role_definition_id, role_id in zip(unique_role_definition_ids, role_ids):
+        if role_id in azure_role_definition_cache:
+            continue
+
+        request_name = str(uuid.uuid4())
+        role_id_by_request_name[request_name] = role_id
         batch_requests.append({
             "httpMethod": "GET",
-            "name": str(uuid.uuid4()),
+            "name": request_name,
             "url": f"https://management.azure.com{role_definition_id}?api-version=2022-04-01"
         })
 
-    http_responses = send_batch_request_to_arm(batch_requests)
+    if batch_requests:
+        http_responses = send_batch_request_to_arm(batch_requests)
 
-    if http_responses is None:
-        print('FATAL ERROR - The Azure role definitions could not be retrieved from ARM.')
-        exit()
- 
-    role_definition_responses = [response['content'] for response in http_responses if response['httpStatusCode'] == 200]
-
-    for role_definition_response in role_definition_responses:
-        all_role_definitions.append({
-            'roleDefinitionId': role_definition_response['id'],
-            'roleId': role_definition_response['name'],
-            'roleName': role_definition_response['properties']['roleName'],
-            'roleType': role_definition_response['properties']['type'],
-            'roleDescription': role_definition_response['properties']['description']
-        })
+        if http_responses is None:
+            print('FATAL ERROR - The Azure role definitions could not be retrieved from ARM.')
+            exit()
+
+        for response in http_responses:
+            if response['httpStatusCode'] != 200:
+                continue
+
+            role_definition_response = response['content']
+            azure_role_definition_cache[role_id_by_request_name[response['name']]] = {
+                'roleDefinitionId': role_definition_response['id'],
+                'roleId': role_definition_response['name'],
+                'roleName': role_definition_response['properties']['roleName'],
+                'roleType': role_definition_response['properties']['type'],
+                'roleDescription': role_definition_response['properties']['description']
+            }
+
+    all_role_definitions = [azure_role_definition_cache[role_id] for role_id in role_ids if role_id in azure_role_definition_cache]
 
     return all_role_definitions
 
@@ -620,10 +760,14 @@ def get_built_in_azure_role_definitions_from_arm(role_definition_ids):
 
 # Entra functions #################################################################################################################################################
 
+@functools.lru_cache(maxsize = 1)
 def is_pim_enabled_for_graph():
     """
         Checks if the passed MS Graph token has access to the PIM endpoints.
 
+        Note:
+            The result is cached for the lifetime of the process, as PIM availability does not change during a sync
+
         Returns:
             bool: True if PIM is enabled, False otherwise
 
@@ -631,7 +775,7 @@ def is_pim_enabled_for_graph():
     token = get_msgraph_access_token()
     endpoint = 'https://graph.microsoft.com/v1.0/roleManagement/directory/roleEligibilityScheduleInstances'
     headers = {'Authorization': f"Bearer {token}"}
-    response = requests.get(endpoint, headers=headers)
+    response = http_session.get(endpoint, headers=headers)
 
     if response.status_code == 200:
         return True
@@ -650,31 +794,30 @@ def get_role_definition_id_of_active_entra_roles_from_graph():
             list(str): list of role definition Ids
     """
     token = get_msgraph_access_token()
-    endpoint = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignments"
+    endpoint = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignments?$select=roleDefinitionId"
     headers = {"Authorization": f"Bearer {token}"}
-    role_definition_ids = []
+    role_definition_ids = set()
     next_link = endpoint
 
     while next_link:
-        response = requests.get(next_link, headers=headers)
+        response = http_session.get(next_link, headers=headers)
 
         if response.status_code != 200:
             print('FATAL ERROR - The active Entra role definition Ids could not be retrieved from MS Graph.')
             exit()
 
-        data = response.json()
+        data = orjson.loads(response.content)
         assignments = data.get("value", [])
 
         for assignment in assignments:
             role_definition_id = assignment.get("roleDefinitionId")
 
             if role_definition_id:
-                role_definition_ids.append(role_definition_id)
+                role_definition_ids.add(role_definition_id)
 
         next_link = data.get("@odata.nextLink")
 
-    # Remove duplicates
-    return list(set(role_definition_ids))
+    return list(role_definition_ids)
 
 
 def get_role_definition_id_of_eligible_entra_roles_from_graph():
@@ -688,36 +831,39 @@ def get_role_definition_id_of_eligible_entra_roles_from_graph():
             list(str): list of role definition Ids
     """
     token = get_msgraph_access_token()
-    endpoint = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleEligibilityScheduleInstances"
+    endpoint = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleEligibilityScheduleInstances?$select=roleDefinitionId"
     headers = {"Authorization": f"Bearer {token}"}
-    role_definition_ids = []
+    role_definition_ids = set()
     next_link = endpoint
 
     while next_link:
-        response = requests.get(next_link, headers=headers)
+        response = http_session.get(next_link, headers=headers)
 
         if response.status_code != 200:
             print('FATAL ERROR - The eligible Entra role definition Ids could not be retrieved from MS Graph.')
             exit()
 
-        data = response.json()
+        data = orjson.loads(response.content)
         eligibles = data.get("value", [])
 
         for eligible in eligibles:
             role_definition_id = eligible.get("roleDefinitionId")
 
             if role_definition_id:
-                role_definition_ids.append(role_definition_id)
+                role_definition_ids.add(role_definition_id)
 
         next_link = data.get("@odata.nextLink")
 
-    # Remove duplicates
-    return list(set(role_definition_ids))
+    return list(role_definition_ids)
 
 
 
 # MS Graph functions ##############################################################################################################################################
 
+# The acquired MS Graph token is kept in memory and reused until shortly before it expires, to avoid a new OIDC exchange for each request
+msgraph_access_token_cache = {'access_token': None, 'expires_at': 0}
+
+
 def get_msgraph_access_token():
     """
         Acquires an MS Graph access token using the GitHub-issued OIDC token.
@@ -725,7 +871,13 @@ def get_msgraph_access_token():
         Returns:
             str: The acquired MS Graph access token.
 
+        Note:
+            The token is cached in memory for the lifetime of the process, and only re-acquired one minute before it expires.
+
     """
+    if msgraph_access_token_cache['access_token'] and time.time() < msgraph_access_token_cache['expires_at'] - 60:
+        return msgraph_access_token_cache['access_token']
+
     azure_tenant_id = os.environ["AZURE_TENANT_ID"]
     azure_client_id = os.environ["AZURE_CLIENT_ID"]
     github_action_token = os.environ.get('ACTIONS_ID_TOKEN_REQUEST_TOKEN')
@@ -734,7 +886,7 @@ def get_msgraph_access_token():
     # Get Github OIDC token
     endpoint = f"{github_action_uri}&audience=api://AzureADTokenExchange"
     headers = {'Authorization': f"Bearer {github_action_token}"}
-    oidc_response = requests.get(endpoint, headers = headers)
+    oidc_response = http_session.get(endpoint, headers = headers)
     github_oidc_token = oidc_response.json()["value"]
 
     # Get MS Graph token
@@ -746,8 +898,15 @@ def get_msgraph_access_token():
         "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
         "client_assertion": github_oidc_token
     }
-    response = requests.post(endpoint, data = body)
-    access_token = response.json().get("access_token")
+    acquired_at = time.time()
+    response = http_session.post(endpoint, data = body)
+    response_content = response.json()
+    access_token = response_content.get("access_token")
+
+    if access_token:
+        # Tokens without a lifetime are assumed to be valid for 55 minutes
+        msgraph_access_token_cache['access_token'] = access_token
+        msgraph_access_token_cache['expires_at'] = acquired_at + int(response_content.get("expires_in", 3300))
 
     return access_token
 
@@ -760,35 +919,96 @@ def get_assigned_msgraph_app_permission_ids():
             list(str): list of MS Graph application permission IDs
     """
     token = get_msgraph_access_token()
-    endpoint = "https://graph.microsoft.com/v1.0/servicePrincipals?$select=id,appId,appRolesAssignedTo"
+    # The app roles assigned to each service principal are expanded inline, to avoid one request per service principal
+    endpoint = "https://graph.microsoft.com/v1.0/servicePrincipals?$select=id&$expand=appRoleAssignments($select=appRoleId)"
     headers = {"Authorization": f"Bearer {token}"}
     permission_ids = set()
+    add_permission_id = permission_ids.add   # Bound once, as it is called for every assignment in the tenant
+    expanded_assignments_limit = 20          # MS Graph returns at most 20 expanded items per directory object
+    truncated_service_principal_ids = []
     next_link = endpoint
 
     while next_link:
-        response = requests.get(next_link, headers=headers)
+        response = http_session.get(next_link, headers=headers)
 
         if response.status_code != 200:
             print('FATAL ERROR - The assigned MS Graph application permissions could not be retrieved from MS Graph.')
             exit()
 
-        data = response.json()
+        data = orjson.loads(response.content)
         service_principals = data.get("value", [])
 
         for sp in service_principals:
-            sp_id = sp.get("id")
-            # Get assigned app roles for this service principal
-            app_roles_endpoint = f"https://graph.microsoft.com/v1.0/servicePrincipals/{sp_id}/appRoleAssignments"
-            roles_response = requests.get(app_roles_endpoint, headers=headers)
-
-            if roles_response.status_code == 200:
-                assignments = roles_response.json().get("value", [])
-                for assignment in assignments:
+            assignments = sp.get("appRoleAssignments", [])
+
+            if len(assignments) >= expanded_assignments_limit or "appRoleAssignments@odata.nextLink" in sp:
+                # The expanded assignments may be incomplete
+                truncated_service_principal_ids.append(sp["id"])
+
+            for assignment in assignments:
+                app_role_id = assignment.get("appRoleId")
+                if app_role_id:
+                    add_permission_id(app_role_id)
+
+        next_link = data.get("@odata.nextLink")
+
+    # The complete assignments of service principals whose expanded assignments may be incomplete are retrieved with batch requests
+    endpoint = "https://graph.microsoft.com/v1.0/$batch"
+    batch_request_size_limit = 20
+    remaining_service_principal_ids = truncated_service_principal_ids
+
+    while remaining_service_principal_ids:
+        chunked_service_principal_ids = remaining_service_principal_ids[:batch_request_size_limit]
+        remaining_service_principal_ids = remaining_service_principal_ids[batch_request_size_limit:]
+        body = {
+            "requests": [ { "id": sp_id, "method": "GET", "url": f"/servicePrincipals/{sp_id}/appRoleAssignments?$select=appRoleId&$top=999" } for sp_id in chunked_service_principal_ids ]
+        }
+        response = http_session.post(endpoint, headers = headers, json = body)
+
+        if response.status_code != 200:
+            print('FATAL ERROR - The assigned MS Graph application permissions could not be retrieved from MS Graph.')
+            exit()
+
+        retry_after_x_seconds = 0
+
+        for batch_response in orjson.loads(response.content).get("responses", []):
+            if batch_response.get("status") == 429:
+                # Throttled requests are sent again in a later batch
+                retry_after_x_seconds = max(retry_after_x_seconds, int(batch_response.get("headers", {}).get("Retry-After", 5)))
+                remaining_service_principal_ids.append(batch_response["id"])
+                continue
+
+            if batch_response.get("status") == 404:
+                # The service principal has been deleted since it was listed, so it has no assignments anymore
+                continue
+
+            if batch_response.get("status") != 200:
+                print('FATAL ERROR - The assigned MS Graph application permissions could not be retrieved from MS Graph.')
+                exit()
+
+            data = batch_response.get("body", {})
+
+            while True:
+                for assignment in data.get("value", []):
                     app_role_id = assignment.get("appRoleId")
                     if app_role_id:
-                        permission_ids.add(app_role_id)
+                        add_permission_id(app_role_id)
 
-        next_link = data.get("@odata.nextLink")
+                next_link = data.get("@odata.nextLink")
+
+                if not next_link:
+                    break
+
+                page_response = http_session.get(next_link, headers=headers)
+
+                if page_response.status_code != 200:
+                    print('FATAL ERROR - The assigned MS Graph application permissions could not be retrieved from MS Graph.')
+                    exit()
+
+                data = orjson.loads(page_response.content)
+
+        if retry_after_x_seconds:
+            time.sleep(retry_after_x_seconds)
 
     return list(permission_ids)
 
@@ -796,26 +1016,123 @@ def get_assigned_msgraph_app_permission_ids():
 
 # Helper functions ################################################################################################################################################
 
+def get_cache_dir():
+    """
+        Retrieves the path to the local directory where upstream content and sync state are cached between runs.
+
+        Returns:
+            str: the path to the local cache directory
+
+    """
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+
+
+def get_unique_role_definition_ids(role_definition_ids):
+    """
+        Removes duplicate role definition Ids, while preserving their original order.
+
+        Note:
+            Role definition Ids are considered duplicates when they share the same role Id (i.e. last segment of the definition Id),
+            as the same role may be assigned at different scopes
+        
+        Args:
+            role_definition_ids(list(str)): list of role definition Ids
+
+        Returns:
+            list(str): list of role definition Ids, with only the first occurrence of each role
+
+    """
+    unique_role_ids = set()
+    unique_role_definition_ids = []
+
+    for role_definition_id in role_definition_ids:
+        role_id = role_definition_id.rsplit('/', 1)[-1]
+
+        if role_id not in unique_role_ids:
+            unique_role_ids.add(role_id)
+            unique_role_definition_ids.append(role_definition_id)
+
+    return unique_role_definition_ids
+
+
+def get_json_from_aat(endpoint):
+    """
+        Retrieves the JSON content served at the passed endpoint of the Azure Administrative Tiering (AAT) project.
+
+        Note:
+            The content is cached locally with its ETag, modification date and digest, so that unchanged content is not downloaded again (GitHub replies with '304 Not Modified')
+
+        Args:
+            endpoint(str): the URL of the JSON file to retrieve from the AAT project
+
+        Returns:
+            tuple(list(), str): the JSON content of the file, or None if it could not be retrieved, and the digest of the content
+
+    """
+    cache_dir = get_cache_dir()
+    cache_file = os.path.join(cache_dir, endpoint.split('/')[-1])
+    cached_response = {}
+    headers = {}
+
+    try:
+        with open(cache_file, 'rb') as file:
+            cached_response = orjson.loads(file.read())
+    except Exception:
+        cached_response = {}
+
+    if cached_response.get('etag') and cached_response.get('digest'):
+        headers['If-None-Match'] = cached_response['etag']
+
+        if cached_response.get('last_modified'):
+            headers['If-Modified-Since'] = cached_response['last_modified']
+    else:
+        # No usable cache, the content is downloaded in full
+        cached_response = {}
+
+    response = http_session.get(endpoint, headers = headers)
+
+    if response.status_code == 304 and cached_response:
+        return cached_response['content'], cached_response['digest']
+
+    if response.status_code != 200:
+        return None, None
+
+    # Decode the raw bytes directly, which is faster than the standard JSON module and skips the text decoding done by requests
+    content = orjson.loads(response.content)
+    content_digest = hashlib.blake2b(response.content, digest_size = 16).hexdigest()
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+
+    if etag:
+        try:
+            os.makedirs(cache_dir, exist_ok = True)
+            with open(cache_file, 'wb') as file:
+                file.write(orjson.dumps({ 'etag': etag, 'last_modified': last_modified, 'digest': content_digest, 'content': content }))
+        except OSError:
+            print('WARNING - The response from the AAT project could not be cached locally.')
+
+    return content, content_digest
+
+
 def get_tiered_builtin_azure_role_definitions_from_aat():
     """
         Retrieves a list of tiered built-in Azure roles from the Azure Administrative Tiering (AAT) project.
        
         Returns:
-            list(): list of dict containing the tiered Azure roles
+            tuple(list(), str): list of dict containing the tiered Azure roles, and the digest of their content
 
         References:
             https://github.com/emiliensocchi/azure-tiering
 
     """
     endpoint = 'https://raw.githubusercontent.com/emiliensocchi/azure-tiering/refs/heads/main/Azure%20roles/tiered-azure-roles.json'
-    response = requests.get(endpoint)
+    tiered_azure_role_definitions, content_digest = get_json_from_aat(endpoint)
 
-    if response.status_code != 200:
+    if tiered_azure_role_definitions is None:
         print('FATAL ERROR - The tiered Azure roles could not be retrieved from the AAT project.')
         exit()
 
-    tiered_azure_role_definitions = response.json()
-    return tiered_azure_role_definitions
+    return tiered_azure_role_definitions, content_digest
 
 
 def get_tiered_builtin_entra_role_definitions_from_aat():
@@ -823,21 +1140,20 @@ def get_tiered_builtin_entra_role_definitions_from_aat():
         Retrieves a list of tiered built-in Entra roles from the Azure Administrative Tiering (AAT) project.
        
         Returns:
-            list(): list of dict containing the tiered Entra roles
+            tuple(list(), str): list of dict containing the tiered Entra roles, and the digest of their content
 
         References:
             https://github.com/emiliensocchi/azure-tiering
 
     """
     endpoint = 'https://raw.githubusercontent.com/emiliensocchi/azure-tiering/refs/heads/main/Entra%20roles/tiered-entra-roles.json'
-    response = requests.get(endpoint)
+    tiered_entra_role_definitions, content_digest = get_json_from_aat(endpoint)
 
-    if response.status_code != 200:
+    if tiered_entra_role_definitions is None:
         print('FATAL ERROR - The tiered Entra roles could not be retrieved from the AAT project.')
         exit()
 
-    tiered_entra_role_definitions = response.json()
-    return tiered_entra_role_definitions
+    return tiered_entra_role_definitions, content_digest
 
 
 def get_tiered_builtin_msgraph_app_permission_definitions_from_aat():
@@ -845,30 +1161,30 @@ def get_tiered_builtin_msgraph_app_permission_definitions_from_aat():
         Retrieves a list of tiered built-in MS Graph application permissions from the Azure Administrative Tiering (AAT) project.
        
         Returns:
-            list(): list of dict containing the tiered application permissions
+            tuple(list(), str): list of dict containing the tiered application permissions, and the digest of their content
 
         References:
             https://github.com/emiliensocchi/azure-tiering
 
     """
     endpoint = 'https://raw.githubusercontent.com/emiliensocchi/azure-tiering/refs/heads/main/Microsoft%20Graph%20application%20permissions/tiered-msgraph-app-permissions.json'
-    response = requests.get(endpoint)
+    tiered_msgraph_app_permission_definitions, content_digest = get_json_from_aat(endpoint)
 
-    if response.status_code != 200:
+    if tiered_msgraph_app_permission_definitions is None:
         print('FATAL ERROR - The tiered MS Graph application permissions could not be retrieved from the AAT project.')
         exit()
 
-    tiered_msgraph_app_permission_definitions = response.json()
-    return tiered_msgraph_app_permission_definitions
+    return tiered_msgraph_app_permission_definitions, content_digest
 
 
-def find_added_assets(extended_assets, base_assets):
+def find_added_assets(extended_assets, base_assets, base_asset_ids = None):
     """
         Compares a base list with a list of extended assets, to determine the assets that have been added to the extended list.
 
         Args:
             extended_assets(list(dict(str:str))): list of extended assets, whose length is equal to or greater than the base list
             base_assets(list(dict(str:str))): list of base assets to compare with
+            base_asset_ids(set(str)): optional set of Ids of the base assets, when already computed by the caller
 
         Returns:
             list(): added assets
@@ -878,26 +1194,20 @@ def find_added_assets(extended_assets, base_assets):
         print ('FATAL ERROR - Improper use of function: the length of the extended list should be equal to or greater than the length of the base list')
         exit() 
 
-    added_assets = []
-    extended_asset_ids = [asset['id'] for asset in extended_assets]
-    base_asset_ids = [asset['id'] for asset in base_assets]
-    added_asset_ids = [asset_id for asset_id in extended_asset_ids if asset_id not in base_asset_ids]
-
-    if added_asset_ids:
-        for added_asset_id in added_asset_ids:
-            asset = [asset for asset in extended_assets if asset['id'] == added_asset_id][0]
-            added_assets.append(asset)
+    base_asset_ids = base_asset_ids if base_asset_ids is not None else {asset['id'] for asset in base_assets}
+    added_assets = [asset for asset in extended_assets if asset['id'] not in base_asset_ids]
 
     return added_assets
 
 
-def find_removed_assets(extended_assets, base_assets):
+def find_removed_assets(extended_assets, base_assets, extended_asset_ids = None):
     """
         Compares a base list with a list of extended assets, to determine the assets that have been removed from the based list.
 
         Args:
             extended_assets(list(dict(str:str))): list of extended assets, whose length is equal to or greater than the base list
             base_assets(list(dict(str:str))): list of base assets to compare with
+            extended_asset_ids(set(str)): optional set of Ids of the extended assets, when already computed by the caller
         
         Returns:
             list(): removed assets
@@ -907,26 +1217,20 @@ def find_removed_assets(extended_assets, base_assets):
         print ('FATAL ERROR - Improper use of function: the length of the extended list should be equal to or greater than the length of the base list')
         exit() 
 
-    removed_assets = []
-    extended_asset_ids = [asset['id'] for asset in extended_assets]
-    base_asset_ids = [asset['id'] for asset in base_assets]
-    removed_asset_ids = [asset_id for asset_id in base_asset_ids if asset_id not in extended_asset_ids]
-
-    if removed_asset_ids:
-        for removed_asset_id in removed_asset_ids:
-            asset = [asset for asset in base_assets if asset['id'] == removed_asset_id][0]
-            removed_assets.append(asset)
+    extended_asset_ids = extended_asset_ids if extended_asset_ids is not None else {asset['id'] for asset in extended_assets}
+    removed_assets = [asset for asset in base_assets if asset['id'] not in extended_asset_ids]
 
     return removed_assets
 
 
-def find_modified_assets(extended_assets, base_assets):
+def find_modified_assets(extended_assets, base_assets, extended_assets_by_id = None):
     """
         Compares a base list with a list of extended assets, to determine the assets that have been modified in the extended list.
 
         Args:
             extended_assets(list(dict(str:str))): list of extended assets, whose length is equal to or greater than the base list
             base_assets(list(dict(str:str))): list of base assets to compare with
+            extended_assets_by_id(dict(str:dict(str:str))): optional extended assets indexed by Id, when already computed by the caller
 
         Returns:
             list(): modified assets
@@ -937,21 +1241,20 @@ def find_modified_assets(extended_assets, base_assets):
         exit() 
 
     modified_assets = []
+    extended_assets_by_id = extended_assets_by_id if extended_assets_by_id is not None else {asset['id']: asset for asset in extended_assets}
 
     for base_asset in base_assets:
-        base_asset_id = base_asset['id']
-        extended_asset = next((asset for asset in extended_assets if asset["id"] == base_asset_id), None)
+        extended_asset = extended_assets_by_id.get(base_asset['id'])
 
-        if extended_assets:
-            base_asset_properties = base_asset.keys()
-            extended_asset_properties = extended_asset.keys()
+        if extended_asset is None:
+            continue
 
-            for base_asset_property in base_asset_properties:
-                if base_asset_property in extended_asset_properties:
-                    is_asset_modified = base_asset[base_asset_property] != extended_asset[base_asset_property]
+        # An asset is reported once, no matter how many of its properties differ
+        shared_asset_properties = base_asset.keys() & extended_asset.keys()
+        is_asset_modified = any(base_asset[asset_property] != extended_asset[asset_property] for asset_property in shared_asset_properties)
 
-                    if is_asset_modified:
-                        modified_assets.append(base_asset)
+        if is_asset_modified:
+            modified_assets.append(base_asset)
 
     return modified_assets
 
@@ -967,89 +1270,302 @@ def read_tiered_json_file(tiered_json_file):
             list(): the content of the tiered JSON file
     """
     try:
-        if os.path.exists(tiered_json_file):
-            with open(tiered_json_file, 'r', encoding = 'utf-8') as file:
+        try:
+            # The file is opened directly rather than checked for existence first, which saves a system call per file
+            with open(tiered_json_file, 'rb', buffering = 65536) as file:
                 file_content = file.read()
 
-                if file_content:
-                    return json.loads(file_content)
+            if file_content:
+                # The raw bytes are parsed directly, without decoding them to text first
+                return orjson.loads(file_content)
 
-        with open(tiered_json_file, 'w+', encoding = 'utf-8') as file:
+        except FileNotFoundError:
+            pass
+
+        # A missing or empty tiered file is initialized as an empty list
+        with open(tiered_json_file, 'w', encoding = 'utf-8') as file:
             file.write('[]')
-            file.seek(0)
-            return json.load(file)
+            return []
     
     except Exception:
         print('FATAL ERROR - The tiered JSON file could not be retrieved.')
         exit()
 
 
-def update_tiered_assets(tiered_json_file, tiered_assets):
+def update_tiered_assets(tiered_json_file, tiered_assets, tiered_file_digest = None):
     """
         Updates the passed file providing an overview of tiered roles and permissions with the passed tiered assets.
 
+        Note:
+            The file is left untouched if its content is already up to date, and is otherwise replaced atomically to never leave a partially-written file behind
+            When the digest of the current file is passed, it is compared instead of the file content, so that the file is not read again
+
         Args:
             tiered_file(str): the local JSON file with tiered roles and permissions
             tiered_assets(list(dict)): the assets to be added to the tiered file
+            tiered_file_digest(bytes): optional digest of the current content of the tiered file, as computed by get_digest_of_tiered_file()
+
+        Returns:
+            bytes: the digest of the content of the tiered file, as computed by get_digest_of_tiered_file()
 
     """
+    # The standard JSON module is kept for serialization, as orjson only indents with 2 spaces and does not escape non-ASCII characters like existing tier files
+    updated_file_content = json.dumps(tiered_assets, indent = 4).encode('utf-8')
+    updated_file_digest = hashlib.blake2b(updated_file_content, digest_size = 16).digest()
+
+    if tiered_file_digest is not None:
+        if tiered_file_digest == updated_file_digest:
+            return updated_file_digest
+    else:
+        try:
+            # The content is only read if the sizes match, as files of different sizes cannot be identical
+            if os.stat(tiered_json_file).st_size == len(updated_file_content):
+                with open(tiered_json_file, 'rb', buffering = 65536) as file:
+                    if file.read() == updated_file_content:
+                        return updated_file_digest
+        except FileNotFoundError:
+            pass
+
+    temporary_file = None
+
     try:
-        with open(tiered_json_file, 'w', encoding = 'utf-8') as file:
-            file.write(json.dumps(tiered_assets, indent = 4))
-    except FileNotFoundError:
+        file_descriptor, temporary_file = tempfile.mkstemp(dir = os.path.dirname(tiered_json_file))
+
+        with os.fdopen(file_descriptor, 'wb', buffering = 65536) as file:
+            file.write(updated_file_content)
+
+        os.chmod(temporary_file, 0o644)
+        os.replace(temporary_file, tiered_json_file)
+    except OSError:
+        if temporary_file and os.path.exists(temporary_file):
+            os.remove(temporary_file)
+
         print('FATAL ERROR - The tiered file could not be updated.')
         exit()
 
+    return updated_file_digest
+
 
-def enrich_asset_with_type(asset, asset_type):
+# Readable asset types, by accepted value of the asset_type parameter of enrich_asset()
+readable_asset_types = {
+    'builtin': 'Built-in',
+    'custom': 'Custom'
+}
+
+
+def enrich_asset(asset, asset_type, asset_scope):
     """
-        Enriches the passed asset with the passed type, while keeping the structure of the asset.
+        Enriches the passed asset with the passed type and scope in a single pass, while keeping the structure of the asset.
     
         Args:
             asset(dict(str:str)): asset to enrich
             asset_type(str): the asset type information used to enrich the asset
+            asset_scope(str): the asset scope information used to enrich the asset
     
         Returns:
             dict(str:str): the enriched asset
     
     """
-    asset_type = asset_type.lower()
-    valid_asset_types = [
-        'builtin',
-        'custom'
-    ]
+    readable_asset_type = readable_asset_types.get(asset_type.lower())
 
-    if asset_type not in valid_asset_types:
+    if readable_asset_type is None:
         print ('FATAL ERROR - Improper use of function: the value of the asset_type parameter is invalid. Accepted values are: builtin, custom')
         exit()
 
-    readable_asset_type = 'Built-in' if asset_type == valid_asset_types[0] else 'Custom'
-    asset_values = list(asset.items())
-    asset_values.insert(3, ('assetType', readable_asset_type))
-    return dict(asset_values)
+    asset_properties = iter(asset.items())
+    enriched_asset = dict(itertools.islice(asset_properties, 3))
+    enriched_asset['assetType'] = readable_asset_type
+    enriched_asset['assignableScope'] = asset_scope
+    enriched_asset.update(asset_properties)
+    return enriched_asset
 
 
-def enrich_asset_with_scope(asset, asset_scope):
+def get_digest_of_tiered_file(tiered_json_file):
     """
-        Enriches the passed asset with the passed scope, while keeping the structure of the asset.
+        Computes a digest of the content of the passed tiered file, to detect changes without comparing the assets it contains.
+
+        Note:
+            The file is hashed as it is stored on disk, in chunks, rather than re-serializing the parsed assets
 
         Args:
-            asset(dict(str:str)): asset to enrich
-            asset_scope(str): the asset scope information used to enrich the asset
+            tiered_json_file(str): the local JSON file with tiered roles and permissions
 
         Returns:
-            dict(str:str): the enriched asset
-    
+            bytes: the digest of the content of the tiered file
+
+    """
+    file_digest = hashlib.blake2b(digest_size = 16)
+
+    try:
+        with open(tiered_json_file, 'rb') as file:
+            for file_chunk in iter(functools.partial(file.read, 65536), b''):
+                file_digest.update(file_chunk)
+    except OSError:
+        print('FATAL ERROR - The tiered JSON file could not be retrieved.')
+        exit()
+
+    return file_digest.digest()
+
+
+@functools.lru_cache(maxsize = 1)
+def get_digest_of_sync_logic():
     """
-    asset_values = list(asset.items())
-    asset_values.insert(4, ('assignableScope', asset_scope))
-    return dict(asset_values)
+        Computes a digest of this script, to detect that the sync logic has changed since the sync state was recorded (e.g. after an upgrade of the action).
+
+        Returns:
+            str: the hex digest of this script
+
+    """
+    with open(os.path.abspath(__file__), 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size = 16).hexdigest()
+
+
+def read_sync_state():
+    """
+        Retrieves the state recorded at the end of the last sync, describing each tiered file as it was once in sync with the AAT project.
+
+        Returns:
+            dict(str:dict): the recorded state of each tiered file, or an empty dict if no state has been recorded
+
+    """
+    try:
+        with open(os.path.join(get_cache_dir(), 'sync-state.json'), 'rb') as file:
+            return orjson.loads(file.read())
+    except Exception:
+        return {}
+
+
+def update_sync_state(sync_state):
+    """
+        Records the passed sync state locally, so that tiered files that are already in sync can be skipped during the next sync.
+
+        Args:
+            sync_state(dict(str:dict)): the state of each tiered file at the end of the sync
+
+    """
+    cache_dir = get_cache_dir()
+
+    try:
+        os.makedirs(cache_dir, exist_ok = True)
+        with open(os.path.join(cache_dir, 'sync-state.json'), 'wb') as file:
+            file.write(orjson.dumps(sync_state))
+    except OSError:
+        print('WARNING - The sync state could not be cached locally.')
+
+
+def is_tiered_file_in_sync(sync_state, tiered_json_file, tiered_file_state):
+    """
+        Checks whether the passed tiered file is still in sync with the AAT project since the last sync, in which case the sync workflow can be skipped.
+
+        Note:
+            The state of a file consists of the digest of the file, the digest of the AAT content, the digest of the sync logic and the configuration of the sync
+            As the sync workflow always produces the same result from the same state, a file is in sync if its state is the same as at the end of the last sync
+            Files only including roles in use are never considered in sync, as role assignments may change in the tenant independently of the AAT project
+
+        Args:
+            sync_state(dict(str:dict)): the state of each tiered file at the end of the last sync
+            tiered_json_file(str): the local JSON file with tiered roles and permissions
+            tiered_file_state(dict(str:str)): the current state of the tiered file
+
+        Returns:
+            bool: True if the tiered file is in sync with the AAT project, False otherwise
+
+    """
+    if tiered_file_state['config']['includeOnlyRolesInUse']:
+        return False
+
+    return sync_state.get(os.path.basename(tiered_json_file)) == tiered_file_state
+
+
+def get_azure_role_ids_in_use(include_individual_resource_scope):
+    """
+        Retrieves the Id of all Azure roles in use in the tenant.
+
+        Note:
+            Active and eligible roles are retrieved for tenants with PIM, while permanently assigned roles are retrieved otherwise
+
+        Args:
+            include_individual_resource_scope(bool): whether to include individual resource scope when looking for roles in use
+
+        Returns:
+            set(str): Ids of all roles in use
+            set(str): Ids of the built-in roles in use
+
+    """
+    # PIM availability is checked while the scopes are enumerated, as both are independent
+    with ThreadPoolExecutor(max_workers = 1) as executor:
+        is_pim_enabled_future = executor.submit(is_pim_enabled_for_arm)
+        azure_scope_resource_ids = get_resource_id_of_higher_scopes_from_arm() if not include_individual_resource_scope else get_resource_id_of_all_scopes_from_arm()
+        is_pim_enabled = is_pim_enabled_future.result()
+
+    if is_pim_enabled:
+        # Get active + eligible roles, with a single batch of requests
+        azure_role_definition_ids_in_use = get_role_definition_id_of_azure_roles_within_scope_from_arm(azure_scope_resource_ids, ('roleAssignmentScheduleInstances', 'roleEligibilityScheduleInstances'))
+        active_azure_role_definition_ids = azure_role_definition_ids_in_use['roleAssignmentScheduleInstances']
+        eligible_azure_role_definition_ids = azure_role_definition_ids_in_use['roleEligibilityScheduleInstances']
+        all_azure_role_definition_ids_in_use = active_azure_role_definition_ids + eligible_azure_role_definition_ids
+    else:
+        # Get permanently assigned roles
+        all_azure_role_definition_ids_in_use = get_role_definition_id_of_assigned_azure_roles_within_scope_from_arm(azure_scope_resource_ids)
+
+    all_azure_role_ids_in_use = {role_definition_id.rsplit('/', 1)[-1] for role_definition_id in all_azure_role_definition_ids_in_use}
+    built_in_azure_role_definitions_in_use = get_built_in_azure_role_definitions_from_arm(all_azure_role_definition_ids_in_use)
+    built_in_azure_role_ids_in_use = {role['roleId'] for role in built_in_azure_role_definitions_in_use}
+
+    return all_azure_role_ids_in_use, built_in_azure_role_ids_in_use
+
+
+def get_entra_role_ids_in_use():
+    """
+        Retrieves the Id of all Entra roles in use in the tenant.
+
+        Note:
+            Active and eligible roles are retrieved for tenants with PIM, while active roles (= permanently assigned) are retrieved otherwise
+
+        Returns:
+            set(str): Ids of all roles in use
+            set(str): Ids of the built-in roles in use, which are not told apart from custom roles
+
+    """
+    # Active roles are needed in both cases, so they are retrieved while PIM availability is checked
+    with ThreadPoolExecutor(max_workers = 1) as executor:
+        active_entra_role_definition_ids_future = executor.submit(get_role_definition_id_of_active_entra_roles_from_graph)
+        is_pim_enabled = is_pim_enabled_for_graph()
+
+        if is_pim_enabled:
+            # Get active + eligible roles
+            eligible_entra_role_definition_ids = get_role_definition_id_of_eligible_entra_roles_from_graph()
+            all_entra_role_definition_ids_in_use = active_entra_role_definition_ids_future.result() + eligible_entra_role_definition_ids
+        else:
+            # Get active roles (= permanently assigned)
+            all_entra_role_definition_ids_in_use = active_entra_role_definition_ids_future.result()
+
+    all_entra_role_ids_in_use = {role_definition_id.rsplit('/', 1)[-1] for role_definition_id in all_entra_role_definition_ids_in_use}
+
+    return all_entra_role_ids_in_use, all_entra_role_ids_in_use
+
+
+def get_msgraph_app_permission_ids_in_use():
+    """
+        Retrieves the Id of all MS Graph application permissions in use in the tenant.
+
+        Returns:
+            set(str): Ids of all permissions in use
+            set(str): Ids of the built-in permissions in use, which are all permissions in use
+
+    """
+    all_assigned_msgraph_app_permission_ids = set(get_assigned_msgraph_app_permission_ids())
+
+    return all_assigned_msgraph_app_permission_ids, all_assigned_msgraph_app_permission_ids
 
 
 def run_sync_workflow(keep_local_changes, include_only_roles_in_use, include_individual_resource_scope, role_type, tiered_builtin_roles_from_aat, tiered_all_roles_from_local):
     """
         Synchronizes the passed roles from AAT with local roles. Local changes are either overriden or preserved based on the passed workflow type.
 
+        Note:
+            Azure roles, Entra roles and MS Graph application permissions are synchronized in the same way, only the retrieval of those in use differs
+
         Args:
             keep_local_changes(bool): the type of workflow to execute, deciding whether local changes should be preserved or overriden from the AAT
             include_only_roles_in_use(bool): whether to include only roles that are currently in use
@@ -1059,177 +1575,124 @@ def run_sync_workflow(keep_local_changes, include_only_roles_in_use, include_ind
             tiered_all_roles_from_local(list(dict)): list of all roles currently tiered locally
 
         Returns:
-            list(dict()): list of synchronized roles with the AAT
+            tuple(bool, list(dict())): whether the local roles have been changed, and the list of synchronized roles with the AAT
 
     """
-    tiered_builtin_roles_from_local = [role for role in tiered_all_roles_from_local if role['assetType'] == 'Built-in']
-    role_type = role_type.lower()
-
-    if role_type == 'azure':
-        # Added Azure roles
-        added_tiered_azure_roles = find_added_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        all_azure_role_ids_in_use = []
-
-        if include_only_roles_in_use:
-            # Check if added roles are in use
-            built_in_azure_role_definitions_in_use = []
-            is_pim_enabled = is_pim_enabled_for_arm()
-
-            if is_pim_enabled:
-                # Get active + eligible roles
-                azure_scope_resource_ids = get_resource_id_of_higher_scopes_from_arm() if not include_individual_resource_scope else get_resource_id_of_all_scopes_from_arm()
-                active_azure_role_definition_ids = get_role_definition_id_of_active_azure_roles_within_scope_from_arm(azure_scope_resource_ids)
-                eligible_azure_role_definition_ids = get_role_definition_id_of_eligible_azure_roles_within_scope_from_arm(azure_scope_resource_ids)
-                all_azure_role_definition_ids_in_use = active_azure_role_definition_ids + eligible_azure_role_definition_ids
-                all_azure_role_ids_in_use = [role_definition_id.split("/")[-1] for role_definition_id in all_azure_role_definition_ids_in_use]
-                built_in_azure_role_definitions_in_use = get_built_in_azure_role_definitions_from_arm(all_azure_role_definition_ids_in_use)
-            else:
-                # Get permanently assigned roles
-                azure_scope_resource_ids = get_resource_id_of_higher_scopes_from_arm() if not include_individual_resource_scope else get_resource_id_of_all_scopes_from_arm()
-                all_azure_role_definition_ids_in_use = get_role_definition_id_of_assigned_azure_roles_within_scope_from_arm(azure_scope_resource_ids)
-                all_azure_role_ids_in_use = [role_definition_id.split("/")[-1] for role_definition_id in all_azure_role_definition_ids_in_use]
-                built_in_azure_role_definitions_in_use = get_built_in_azure_role_definitions_from_arm(all_azure_role_definition_ids_in_use)
-
-            # Filter out only the roles that are in use
-            added_tiered_azure_roles = [role for role in added_tiered_azure_roles if role['id'] in [r['roleId'] for r in built_in_azure_role_definitions_in_use]]
-
-        # Enrich and add the roles to the local tiered roles
-        for added_azure_role in added_tiered_azure_roles:
-            type_enriched_added_azure_role = enrich_asset_with_type(added_azure_role, 'builtin')
-            fully_enriched_added_azure_role = enrich_asset_with_scope(type_enriched_added_azure_role, '/')
-            tiered_all_roles_from_local.append(fully_enriched_added_azure_role)
-
-        # Modified Azure roles
-        if not keep_local_changes:
-            modified_tiered_azure_roles = find_modified_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-
-            for modified_tiered_azure_role in modified_tiered_azure_roles:
-                tiered_azure_roles_from_aat = [role for role in tiered_builtin_roles_from_aat if role['id'] == modified_tiered_azure_role['id']]
-
-                if len(tiered_azure_roles_from_aat) > 0:
-                    tiered_azure_role_from_aat = tiered_azure_roles_from_aat[0]
-                    type_enriched_tiered_azure_role_from_aat = enrich_asset_with_type(tiered_azure_role_from_aat, 'builtin')
-                    fully_enriched_added_azure_role = enrich_asset_with_scope(type_enriched_tiered_azure_role_from_aat, '/')
-                    index = next((i for i, role in enumerate(tiered_all_roles_from_local) if role['id'] == modified_tiered_azure_role['id']), None)
-                    tiered_all_roles_from_local[index] = fully_enriched_added_azure_role
-
-        # Removed Azure roles
-        removed_tiered_azure_roles = find_removed_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        removed_tiered_built_in_azure_role = [role for role in removed_tiered_azure_roles if role['assetType'] == 'Built-in']   # Custom roles should always be preserved
-
-        for removed_azure_role in removed_tiered_built_in_azure_role:
-            removed_azure_role_id = removed_azure_role['id']
-            tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if role['id'] != removed_azure_role_id]
-
-        if include_only_roles_in_use:
-            # Check if tiered roles are still in use
-            tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if (role['id'] in all_azure_role_ids_in_use or role['assetType'] == 'Custom')]
-
-
-    elif role_type == 'entra':
-        # Added Entra roles
-        added_tiered_entra_roles = find_added_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        all_entra_role_ids_in_use = []
-
-        if include_only_roles_in_use:
-            # Check if added roles are in use
-            is_pim_enabled = is_pim_enabled_for_graph()
-
-            if is_pim_enabled:
-                # Get active + eligible roles
-                active_entra_role_definition_ids = get_role_definition_id_of_active_entra_roles_from_graph()
-                eligible_entra_role_definition_ids = get_role_definition_id_of_eligible_entra_roles_from_graph()
-                all_entra_role_definition_ids_in_use = active_entra_role_definition_ids + eligible_entra_role_definition_ids
-                all_entra_role_ids_in_use = [role_definition_id.split("/")[-1] for role_definition_id in all_entra_role_definition_ids_in_use]
-                built_in_entra_role_definitions_in_use = [role for role in added_tiered_entra_roles if role['id'] in all_entra_role_definition_ids_in_use]
-            else:
-                # Get active roles (= permanently assigned)
-                all_entra_role_definition_ids_in_use = get_role_definition_id_of_active_entra_roles_from_graph()
-                all_entra_role_ids_in_use = [role_definition_id.split("/")[-1] for role_definition_id in all_entra_role_definition_ids_in_use]
-                built_in_entra_role_definitions_in_use = [role for role in added_tiered_entra_roles if role['id'] in all_entra_role_definition_ids_in_use]
-
-            # Filter out only the roles that are in use
-            added_tiered_entra_roles = [role for role in added_tiered_entra_roles if role['id'] in [r['id'] for r in built_in_entra_role_definitions_in_use]]
-
-        # Enrich and add the roles to the local tiered roles
-        for added_entra_role in added_tiered_entra_roles:
-            type_enriched_added_entra_role = enrich_asset_with_type(added_entra_role, 'builtin')
-            fully_enriched_added_entra_role = enrich_asset_with_scope(type_enriched_added_entra_role, '/')
-            tiered_all_roles_from_local.append(fully_enriched_added_entra_role)
-
-        # Modified Entra roles
-        if not keep_local_changes:
-            modified_tiered_entra_roles = find_modified_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-
-            for modified_tiered_entra_role in modified_tiered_entra_roles:
-                tiered_entra_roles_from_aat = [role for role in tiered_builtin_roles_from_aat if role['id'] == modified_tiered_entra_role['id']]
-
-                if len(tiered_entra_roles_from_aat) > 0:
-                    tiered_entra_role_from_aat = tiered_entra_roles_from_aat[0]
-                    type_enriched_tiered_entra_role_from_aat = enrich_asset_with_type(tiered_entra_role_from_aat, 'builtin')
-                    fully_enriched_tiered_entra_role_from_aat = enrich_asset_with_scope(type_enriched_tiered_entra_role_from_aat, '/')
-                    index = next((i for i, role in enumerate(tiered_all_roles_from_local) if role['id'] == modified_tiered_entra_role['id']), None)
-                    tiered_all_roles_from_local[index] = fully_enriched_tiered_entra_role_from_aat
-
-        # Removed Entra roles
-        removed_tiered_entra_roles = find_removed_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        removed_tiered_built_in_entra_role = [role for role in removed_tiered_entra_roles if role['assetType'] == 'Built-in']   # Custom roles should always be preserved
-
-        for removed_role in removed_tiered_built_in_entra_role:
-            removed_role_id = removed_role['id']
-            tiered_all_entra_roles_from_local = [role for role in tiered_all_entra_roles_from_local if role['id'] != removed_role_id]
-
-        if include_only_roles_in_use:
-            # Check if tiered roles are still in use
-            tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if (role['id'] in all_entra_role_ids_in_use or role['assetType'] == 'Custom')]
-
-    elif role_type == 'graph':
-        # Added MS Graph application permissions
-        added_tiered_msgraph_permissions = find_added_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        all_assigned_msgraph_app_permission_ids = []
-
-        if include_only_roles_in_use:
-            # Check if added permissions are in use
-            all_assigned_msgraph_app_permission_ids = get_assigned_msgraph_app_permission_ids()
-            # Filter out only the permissions that are in use
-            added_tiered_msgraph_permissions = [perm for perm in added_tiered_msgraph_permissions if perm['id'] in all_assigned_msgraph_app_permission_ids]
-
-        # Enrich and add the roles to the local tiered roles
-        for added_msgraph in added_tiered_msgraph_permissions:
-            type_enriched_added_msgraph = enrich_asset_with_type(added_msgraph, 'builtin')
-            fully_enriched_added_msgraph = enrich_asset_with_scope(type_enriched_added_msgraph, '/')
-            tiered_all_roles_from_local.append(fully_enriched_added_msgraph)
-
-        # Modified MS Graph application permissions
-        if not keep_local_changes:
-            modified_tiered_msgraph_permisssions = find_modified_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-
-            for modified_tiered_msgraph in modified_tiered_msgraph_permisssions:
-                tiered_msgraph_from_aat = [role for role in tiered_builtin_roles_from_aat if role['id'] == modified_tiered_msgraph['id']]
-
-                if len(tiered_msgraph_from_aat) > 0:
-                    tiered_msgraph_from_aat = tiered_msgraph_from_aat[0]
-                    type_enriched_tiered_msgraph_from_aat = enrich_asset_with_type(tiered_msgraph_from_aat, 'builtin')
-                    fully_enriched_tiered_msgraph_from_aat = enrich_asset_with_scope(type_enriched_tiered_msgraph_from_aat, '/')
-                    index = next((i for i, role in enumerate(tiered_all_roles_from_local) if role['id'] == modified_tiered_msgraph['id']), None)
-                    tiered_all_roles_from_local[index] = fully_enriched_tiered_msgraph_from_aat
-
-        # Removed MS Graph application permissions
-        removed_tiered_msgraph_permisssions = find_removed_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local)
-        removed_tiered_built_in_msgraph_permission = [role for role in removed_tiered_msgraph_permisssions if role['assetType'] == 'Built-in']   # Custom roles should always be preserved
-
-        for removed_role in removed_tiered_built_in_msgraph_permission:
-            removed_role_id = removed_role['id']
-            tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if role['id'] != removed_role_id]
-
-        if include_only_roles_in_use:
-            # Check if tiered permissions are still in use
-            tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if (role['id'] in all_assigned_msgraph_app_permission_ids or role['assetType'] == 'Custom')]
-    else:
+    role_ids_in_use_getters = {
+        'azure': lambda: get_azure_role_ids_in_use(include_individual_resource_scope),
+        'entra': get_entra_role_ids_in_use,
+        'graph': get_msgraph_app_permission_ids_in_use
+    }
+    get_role_ids_in_use = role_ids_in_use_getters.get(role_type.lower())
+
+    if get_role_ids_in_use is None:
         print ('FATAL ERROR - Improper use of function: the value of the role_type parameter is invalid. Accepted values are: azure, entra, graph')
         exit()
 
-    return tiered_all_roles_from_local
+    tiered_builtin_roles_from_local = [role for role in tiered_all_roles_from_local if role['assetType'] == 'Built-in']
+    tiered_builtin_role_ids_from_local = {role['id'] for role in tiered_builtin_roles_from_local}
+    tiered_builtin_roles_from_aat_by_id = {role['id']: role for role in tiered_builtin_roles_from_aat}
+    tiered_builtin_role_ids_from_aat = tiered_builtin_roles_from_aat_by_id.keys()
+
+    # Added roles
+    added_tiered_roles = find_added_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local, base_asset_ids = tiered_builtin_role_ids_from_local)
+    all_role_ids_in_use = set()
+
+    if include_only_roles_in_use:
+        # Check if added roles are in use
+        all_role_ids_in_use, built_in_role_ids_in_use = get_role_ids_in_use()
+
+        # Filter out only the roles that are in use
+        added_tiered_roles = [role for role in added_tiered_roles if role['id'] in built_in_role_ids_in_use]
+
+    # Enrich the added roles
+    enriched_added_tiered_roles = [enrich_asset(added_role, 'builtin', '/') for added_role in added_tiered_roles]
+    has_changed = len(enriched_added_tiered_roles) > 0
+
+    # Modified roles
+    enriched_modified_roles_by_id = {}
+
+    if not keep_local_changes:
+        modified_tiered_roles = find_modified_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local, extended_assets_by_id = tiered_builtin_roles_from_aat_by_id)
+
+        for modified_tiered_role in modified_tiered_roles:
+            tiered_role_from_aat = tiered_builtin_roles_from_aat_by_id.get(modified_tiered_role['id'])
+
+            if tiered_role_from_aat is None:
+                continue
+
+            enriched_modified_roles_by_id[modified_tiered_role['id']] = enrich_asset(tiered_role_from_aat, 'builtin', '/')
+
+        has_changed = has_changed or len(enriched_modified_roles_by_id) > 0
+
+    # Removed roles
+    removed_tiered_built_in_roles = find_removed_assets(tiered_builtin_roles_from_aat, tiered_builtin_roles_from_local, extended_asset_ids = tiered_builtin_role_ids_from_aat)   # Custom roles are always preserved, as only built-in roles are compared with the AAT
+    removed_role_ids = {role['id'] for role in removed_tiered_built_in_roles}
+
+    # Build the synchronized roles in a single pass, without changing the passed local roles
+    synchronized_roles_count = len(tiered_all_roles_from_local) + len(enriched_added_tiered_roles)
+    tiered_all_roles_from_local = [enriched_modified_roles_by_id.get(role['id'], role) for role in itertools.chain(tiered_all_roles_from_local, enriched_added_tiered_roles) if role['id'] not in removed_role_ids]
+
+    if include_only_roles_in_use:
+        # Check if tiered roles are still in use
+        tiered_all_roles_from_local = [role for role in tiered_all_roles_from_local if (role['id'] in all_role_ids_in_use or role['assetType'] == 'Custom')]
+
+    has_changed = has_changed or len(tiered_all_roles_from_local) != synchronized_roles_count
+
+    return has_changed, tiered_all_roles_from_local
+
+
+def sync_tiered_assets(label, asset_noun, tier_file, get_tiered_builtin_assets_from_aat, role_type, sync_config, sync_state):
+    """
+        Synchronizes the passed tier file with the latest upstream version of its assets from the AAT, and updates the file if needed.
+
+        Args:
+            label(str): the label of the synchronized assets, used in the returned message
+            asset_noun(str): the noun describing a group of synchronized assets, used in the returned message (e.g. 'roles')
+            tier_file(str): the local JSON file with tiered assets
+            get_tiered_builtin_assets_from_aat(function): the function retrieving the tiered built-in assets from the AAT
+            role_type(str): the type of role to synchronize (accepted values: 'azure', 'entra', 'graph')
+            sync_config(dict(str:bool)): the configuration of the current sync
+            sync_state(dict(str:dict)): the state of each tiered file at the end of the last sync
+
+        Returns:
+            tuple(str, dict(str:str)): the message describing the outcome of the sync, and the state of the tier file after the sync
+
+    """
+    tiered_builtin_assets_from_aat, tiered_builtin_assets_from_aat_digest = get_tiered_builtin_assets_from_aat()
+
+    # The tier file is only hashed at first, so that a file already in sync is never parsed (a missing file is never in sync)
+    tiered_all_assets_from_local_digest = get_digest_of_tiered_file(tier_file) if os.path.exists(tier_file) else None
+    tiered_file_state = { 'digest': tiered_all_assets_from_local_digest.hex() if tiered_all_assets_from_local_digest else None, 'aatDigest': tiered_builtin_assets_from_aat_digest, 'syncerDigest': get_digest_of_sync_logic(), 'config': sync_config }
+
+    if is_tiered_file_in_sync(sync_state, tier_file, tiered_file_state):
+        return f"{label}: no change", tiered_file_state
+
+    tiered_all_assets_from_local = read_tiered_json_file(tier_file)
+
+    has_aat_been_updated, updated_tiered_all_assets_from_local = run_sync_workflow(sync_config['keepLocalChanges'], sync_config['includeOnlyRolesInUse'], sync_config['includeIndividualResourceScope'], role_type, tiered_builtin_assets_from_aat, tiered_all_assets_from_local)
+
+    if not has_aat_been_updated:
+        return f"{label}: no change", tiered_file_state
+
+    # The kind of change is derived from the assets that have been added or removed, as a difference in size hides additions and removals of the same number of assets
+    tiered_all_asset_ids_from_local = frozenset(asset['id'] for asset in tiered_all_assets_from_local)
+    updated_tiered_all_asset_ids_from_local = frozenset(asset['id'] for asset in updated_tiered_all_assets_from_local)
+    has_assets_been_added = not updated_tiered_all_asset_ids_from_local <= tiered_all_asset_ids_from_local
+    has_assets_been_removed = not tiered_all_asset_ids_from_local <= updated_tiered_all_asset_ids_from_local
+    # The sort key is computed once per asset by list.sort(), which already keeps the keys in a separate array from the assets
+    updated_tiered_all_assets_from_local.sort(key = itemgetter('tier', 'assetName'))
+    updated_tiered_all_assets_from_local_digest = update_tiered_assets(tier_file, updated_tiered_all_assets_from_local, tiered_file_digest = tiered_all_assets_from_local_digest)
+    tiered_file_state['digest'] = updated_tiered_all_assets_from_local_digest.hex()
+
+    if has_assets_been_added:
+        sync_message = f"{label}: changes have been detected and merged from public AzTier"
+    elif has_assets_been_removed:
+        sync_message = f"{label}: no change detected in public AzTier, but upstream {asset_noun} are not used locally anymore and have been removed from tiered assets"
+    else:
+        sync_message = f"{label}: no change detected in public AzTier, but local changes have been overridden with upstream data ('keepLocalChanges' is set to 'false')"
+
+    return sync_message, tiered_file_state
 
 
 
@@ -1253,8 +1716,8 @@ if __name__ == "__main__":
     # Get project configuration from local config file
     project_config = {}
     try:
-        with open(config_file, 'r', encoding = 'utf-8') as file:
-            project_config = json.load(file)
+        with open(config_file, 'rb') as file:
+            project_config = orjson.loads(file.read())
     except Exception:
         print('FATAL ERROR - The config JSON file could not be retrieved.')
         exit()
@@ -1280,77 +1743,34 @@ if __name__ == "__main__":
     include_only_roles_in_use = True if include_only_roles_in_use_config == 'true' else False
     include_individual_resource_scope = True if include_individual_resource_scope_config == 'true' else False
 
+    # Get the state of the tiered files at the end of the last sync
+    sync_config = { 'keepLocalChanges': keep_local_changes, 'includeOnlyRolesInUse': include_only_roles_in_use, 'includeIndividualResourceScope': include_individual_resource_scope }
+    sync_state = read_sync_state()
 
-    # AZURE ROLES ##################################################################################################################################################################
 
-    # Update locally-tiered Azure roles with the latest upstream version
-    tiered_all_azure_roles_from_local = read_tiered_json_file(azure_roles_tier_file)
-    tiered_builtin_azure_roles_from_aat = get_tiered_builtin_azure_role_definitions_from_aat()
+    # TIERED ASSETS ################################################################################################################################################################
 
-    updated_tiered_all_azure_roles_from_local = run_sync_workflow(keep_local_changes, include_only_roles_in_use, include_individual_resource_scope, 'azure', tiered_builtin_azure_roles_from_aat, tiered_all_azure_roles_from_local[:])
-    has_aat_been_updated = False if (updated_tiered_all_azure_roles_from_local == tiered_all_azure_roles_from_local) else True
-
-    if has_aat_been_updated:
-        has_aat_been_updated = False if (len(updated_tiered_all_azure_roles_from_local) == len(tiered_all_azure_roles_from_local)) else True
-        tiered_all_azure_roles_from_local = sorted(updated_tiered_all_azure_roles_from_local, key=lambda x: (x['tier'], x['assetName']))
-        update_tiered_assets(azure_roles_tier_file, tiered_all_azure_roles_from_local)
-
-        if has_aat_been_updated:
-            if len(updated_tiered_all_azure_roles_from_local) < len(tiered_all_azure_roles_from_local):
-                print ('Built-in Azure roles: no change detected in public AzTier, but upstream roles are not used locally anymore and have been removed from tiered assets')
-            else:
-                print ('Built-in Azure roles: changes have been detected and merged from public AzTier')
-        else:
-            print ("Built-in Azure roles: no change detected in public AzTier, but local changes have been overridden with upstream data ('keepLocalChanges' is set to 'false')")
-    else:
-        print ('Built-in Azure roles: no change')
-
-
-    # ENTRA ROLES ##################################################################################################################################################################
-
-    # Update locally-tiered Entra roles with the latest upstream version
-    tiered_all_entra_roles_from_local = read_tiered_json_file(entra_roles_tier_file)
-    tiered_builtin_entra_roles_from_aat = get_tiered_builtin_entra_role_definitions_from_aat()
-
-    updated_tiered_all_entra_roles_from_local = run_sync_workflow(keep_local_changes, include_only_roles_in_use, include_individual_resource_scope, 'entra', tiered_builtin_entra_roles_from_aat, tiered_all_entra_roles_from_local[:])
-    has_aat_been_updated = False if (updated_tiered_all_entra_roles_from_local == tiered_all_entra_roles_from_local) else True
-
-    if has_aat_been_updated:
-        has_aat_been_updated = False if (len(updated_tiered_all_entra_roles_from_local) == len(tiered_all_entra_roles_from_local)) else True
-        tiered_all_entra_roles_from_local = sorted(updated_tiered_all_entra_roles_from_local, key=lambda x: (x['tier'], x['assetName']))
-        update_tiered_assets(entra_roles_tier_file, tiered_all_entra_roles_from_local)
-
-        if has_aat_been_updated:
-            if len(updated_tiered_all_entra_roles_from_local) < len(tiered_all_entra_roles_from_local):
-                print ('Built-in Entra roles: no change detected in public AzTier, but upstream roles are not used locally anymore and have been removed from tiered assets')
-            else:
-                print ('Built-in Entra roles: changes have been detected and merged from public AzTier')
-        else:
-            print ("Built-in Entra roles: no change detected in public AzTier, but local changes have been overridden with upstream data ('keepLocalChanges' is set to 'false')")
-    else:
-        print ('Built-in Entra roles: no change')
+    # Azure roles, Entra roles and MS Graph application permissions are synchronized in the same way, only their labels, tier files and upstream source differ
+    tiered_asset_kinds = [
+        ('Built-in Azure roles', 'roles', azure_roles_tier_file, get_tiered_builtin_azure_role_definitions_from_aat, 'azure'),
+        ('Built-in Entra roles', 'roles', entra_roles_tier_file, get_tiered_builtin_entra_role_definitions_from_aat, 'entra'),
+        ('Built-in MS Graph app permissions', 'permissions', msgraph_app_permissions_tier_file, get_tiered_builtin_msgraph_app_permission_definitions_from_aat, 'graph')
+    ]
 
+    # Each kind of asset is read from its own tier file and upstream source, so they are synchronized concurrently
+    with ThreadPoolExecutor(max_workers = len(tiered_asset_kinds)) as executor:
+        sync_results = list(executor.map(lambda tiered_asset_kind: sync_tiered_assets(*tiered_asset_kind, sync_config, sync_state), tiered_asset_kinds))
 
-    # GRAPH PERMISSIONS ############################################################################################################################################################
+    sync_messages = []
 
-    # Update locally-tiered MS Graph application permissions with the latest upstream version
-    tiered_all_msgraph_app_permissions_from_local = read_tiered_json_file(msgraph_app_permissions_tier_file)
-    tiered_builtin_msgraph_app_permissions_from_aat = get_tiered_builtin_msgraph_app_permission_definitions_from_aat()
+    for (label, asset_noun, tier_file, get_tiered_builtin_assets_from_aat, role_type), (sync_message, tiered_file_state) in zip(tiered_asset_kinds, sync_results):
+        sync_messages.append(sync_message)
+        sync_state[os.path.basename(tier_file)] = tiered_file_state
 
-    updated_tiered_all_msgraph_app_permissions_from_local = run_sync_workflow(keep_local_changes, include_only_roles_in_use, include_individual_resource_scope, 'graph', tiered_builtin_msgraph_app_permissions_from_aat, tiered_all_msgraph_app_permissions_from_local[:])
-    has_aat_been_updated = False if (updated_tiered_all_msgraph_app_permissions_from_local == tiered_all_msgraph_app_permissions_from_local) else True
+    # The outcome of all syncs is reported at once
+    sys.stdout.write('\n'.join(sync_messages) + '\n')
+    sys.stdout.flush()
 
-    if has_aat_been_updated:
-        has_aat_been_updated = False if (len(updated_tiered_all_msgraph_app_permissions_from_local) == len(tiered_all_msgraph_app_permissions_from_local)) else True
-        tiered_all_msgraph_app_permissions_from_local = sorted(updated_tiered_all_msgraph_app_permissions_from_local, key=lambda x: (x['tier'], x['assetName']))
-        update_tiered_assets(msgraph_app_permissions_tier_file, tiered_all_msgraph_app_permissions_from_local)
 
-        if has_aat_been_updated:
-            if len(updated_tiered_all_msgraph_app_permissions_from_local) < len(tiered_all_msgraph_app_permissions_from_local):
-                print ('Built-in MS Graph app permissions: no change detected in public AzTier, but upstream permissions are not used locally anymore and have been removed from tiered assets')
-            else:
-                print ('Built-in MS Graph app permissions: changes have been detected and merged from public AzTier')
-        else:
-            print ("Built-in MS Graph app permissions: no change detected in public AzTier, but local changes have been overridden with upstream data ('keepLocalChanges' is set to 'false')")
-    else:
-        print ('Built-in MS Graph app permissions: no change')
+    # Record the state of the tiered files for the next sync
+    update_sync_state(sync_state)
@@ -3,242 +3,345 @@ The AzTier backend application, which makes the resources defined in "./app/azti
 """
 from azure.identity import DefaultAzureCredential, WorkloadIdentityCredential
 from azure.keyvault.secrets import SecretClient
-from flask import Flask, jsonify, make_response
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, abort, make_response, request
 from kubernetes import client, config
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote
+from urllib3.util.retry import Retry
+import functools
+import gzip
+import hashlib
+import json
 import os
 import requests
+import threading
+import time
 
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# A single session is shared by all requests to GitHub, so that connections are kept alive and reused instead of re-negotiated for each request
+github_session = requests.Session()
+github_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.2)))
+
+# Files served from the GitHub repository, by API path
+served_files = {
+    'tier-definitions': 'tier_definitions.json',
+    'project-config': 'config.json',
+    'azure/tiered-roles': 'Azure roles/tiered-azure-roles.json',
+    'azure/untiered-roles': 'Azure roles/untiered-azure-roles.json',
+    'entra/tiered-roles': 'Entra roles/tiered-entra-roles.json',
+    'entra/untiered-roles': 'Entra roles/untiered-entra-roles.json',
+    'msgraph/tiered-permissions': 'Microsoft Graph application permissions/tiered-msgraph-app-permissions.json',
+    'msgraph/untiered-permissions': 'Microsoft Graph application permissions/untiered-msgraph-app-permissions.json'
+}
+
+# GitHub API URLs of the served files, by repository file path (computed once the repository is known)
+github_file_urls = {}
+
+# Secrets retrieved from Azure Key Vault, by vault URL and secret name
+key_vault_secrets = {}
+
+# Raw content of the served files, kept in memory for a short time so that most requests do not wait for GitHub
+served_file_cache = {}
+served_file_cache_ttl_seconds = 60
+
+# Expired served files requested together (e.g. in a bundle) are retrieved concurrently by a pool shared by all requests
+served_file_executor = ThreadPoolExecutor(max_workers=len(served_files))
+
+# Gzip-compressed content of the latest bundle, by ETag
+served_bundle_gzip_cache = {}
+
+# Cached files are refreshed in the background more often than they expire, so that requests never have to wait for GitHub
+served_file_refresh_interval_seconds = 30
+
 
 # Helpers functions #######################################################################
 
-def get_secret_from_key_vault(vault_url, secret_name):
+@functools.lru_cache(maxsize=1)
+def get_workload_identity_credential():
     """
-    Retrieve a secret from an Azure Key Vault using Azure Workload Identity.
+    Create the Azure Workload Identity credential of the application, once for the lifetime of the process.
 
-    Args:
-        vault_url (str): The URL of the Azure Key Vault.
-        secret_name (str): The name of the secret to retrieve.
+    Note:
+        Reusing the same credential allows the access tokens it obtains to be cached and reused until they expire.
 
     Returns:
-        str: The value of the secret.
+        WorkloadIdentityCredential: The credential of the application.
     """
     tenant_id = os.environ["AZURE_TENANT_ID"]
     client_id = os.environ["AZURE_CLIENT_ID"]
     token_file = os.environ["AZURE_FEDERATED_TOKEN_FILE"]
-    credential = WorkloadIdentityCredential(
+    return WorkloadIdentityCredential(
         tenant_id=tenant_id,
         client_id=client_id,
         token_file_path=token_file
     )
-    client = SecretClient(vault_url=vault_url, credential=credential)
-    secret = client.get_secret(secret_name)
-    return secret.value
 
 
+@functools.lru_cache(maxsize=16)
+def get_key_vault_client(vault_url):
+    """
+    Create a client for an Azure Key Vault, once per vault for the lifetime of the process.
 
-# Routing functions ##########################################################################
+    Args:
+        vault_url (str): The URL of the Azure Key Vault.
 
-@app.route('/healthz')
-def healthz():
-    """
-    Health check endpoint.
+    Returns:
+        SecretClient: The client of the Azure Key Vault.
     """
-    return 'ok', 200
+    return SecretClient(vault_url=vault_url, credential=get_workload_identity_credential())
 
 
-@app.route('/api/tier-definitions')
-def api_get_tier_definitions():
+def get_secret_from_key_vault(vault_url, secret_name, refresh=False):
     """
-    Get the tier definitions from the GitHub repository.
+    Retrieve a secret from an Azure Key Vault using Azure Workload Identity, unless it has been retrieved before.
+
+    Args:
+        vault_url (str): The URL of the Azure Key Vault.
+        secret_name (str): The name of the secret to retrieve.
+        refresh (bool): Whether to retrieve the secret from the Key Vault again, e.g. after it has been rotated.
 
     Returns:
-        JSON response from the GitHub API.
+        str: The value of the secret.
     """
-    file_path_to_serve = 'tier_definitions.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
-    return resp
+    secret_key = (vault_url, secret_name)
+
+    if refresh or secret_key not in key_vault_secrets:
+        secret = get_key_vault_client(vault_url).get_secret(secret_name)
+        key_vault_secrets[secret_key] = secret.value
 
+    return key_vault_secrets[secret_key]
 
-@app.route('/api/project-config')
-def api_get_project_config():
+
+def authenticate_github_session(refresh=False):
     """
-    Get the project configuration from the GitHub repository.
+    Authenticate all requests to GitHub with the PAT token stored in Azure Key Vault.
 
-    Returns:
-        JSON response from the GitHub API.
+    Args:
+        refresh (bool): Whether to retrieve the PAT token from Azure Key Vault again, e.g. after it has been rotated.
     """
-    file_path_to_serve = 'config.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
+    az_keyvault_secret_uri = app.config['AZURE_KEY_VAULT_URL']
+    splitted_az_keyvault_secret_uri = az_keyvault_secret_uri.split('/secrets/')
+    az_keyvault_uri = splitted_az_keyvault_secret_uri[0]
+    az_keyvault_secret_name = splitted_az_keyvault_secret_uri[1]
+    github_pat_token = get_secret_from_key_vault(az_keyvault_uri, az_keyvault_secret_name, refresh=refresh)
+    app.config['GITHUB_PAT_TOKEN'] = github_pat_token
+
+    github_session.headers.update({
+        'Authorization': f'token {github_pat_token}',
         'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
-    return resp
+    })
 
 
-@app.route('/api/azure/tiered-roles')
-def api_get_azure_tiered_roles():
+def get_file_from_github(file_path, refresh=False):
     """
-    Get the tiered roles for Azure from the GitHub repository.
+    Retrieve the raw content of a file from the GitHub repository, unless it has been retrieved recently.
+
+    Note:
+        Once the cached content has expired, it is revalidated with GitHub using its ETag, so that an unchanged file is not downloaded again.
+
+    Args:
+        file_path (str): The path of the file in the GitHub repository.
+        refresh (bool): Whether to revalidate the cached content with GitHub, even if it has not expired yet.
 
     Returns:
-        JSON response from the GitHub API.
+        dict: The raw content of the file (also gzip-compressed), with the ETag and Cache-Control headers returned by GitHub.
     """
-    file_path_to_serve = 'Azure roles/tiered-azure-roles.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    # Encode the file path to handle spaces and special characters
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
+    cached_file = served_file_cache.get(file_path)
+
+    if cached_file and not refresh and time.monotonic() - cached_file['retrieved_at'] < served_file_cache_ttl_seconds:
+        return cached_file
+
+    url = github_file_urls[file_path]
+    headers = {'If-None-Match': cached_file['etag']} if cached_file and cached_file['etag'] else {}
+    response = github_session.get(url, headers=headers, timeout=(3, 10))
+
+    if response.status_code == 401:
+        # The PAT token may have been rotated in Azure Key Vault since it was retrieved
+        authenticate_github_session(refresh=True)
+        response = github_session.get(url, headers=headers, timeout=(3, 10))
+
+    if response.status_code == 304:
+        # The file has not changed since it was cached
+        cached_file['retrieved_at'] = time.monotonic()
+        return cached_file
+
     response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
-    return resp
 
+    served_file = {
+        'retrieved_at': time.monotonic(),
+        'etag': response.headers.get('ETag'),
+        'cache_control': response.headers.get('Cache-Control', 'max-age=60'),
+        'content': response.content,
+        'content_gzip': gzip.compress(response.content, compresslevel=6)
+    }
+    served_file_cache[file_path] = served_file
+    return served_file
 
-@app.route('/api/azure/untiered-roles')
-def api_get_azure_untiered_roles():
-    """
-    Get the untiered roles for Azure from the GitHub repository.
 
-    Returns:
-        JSON response from the GitHub API.
+def refresh_served_files():
     """
-    file_path_to_serve = 'Azure roles/untiered-azure-roles.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
-    return resp
+    Refresh the cached content of all served files periodically, for as long as the application is running.
+    """
+    while True:
+        for file_path in served_files.values():
+            try:
+                get_file_from_github(file_path, refresh=True)
+            except Exception as e:
+                # The cached content is kept, and the file is retrieved again on the next request or refresh (errors may also come from Azure Key Vault, when the PAT token is refreshed)
+                app.logger.warning(f'Could not refresh "{file_path}" from GitHub: {e}')
+
+        time.sleep(served_file_refresh_interval_seconds)
 
 
-@app.route('/api/entra/tiered-roles')
-def api_get_entra_tiered_roles():
+def compress_response(resp, content_gzip):
     """
-    Get the tiered roles for Entra from the GitHub repository.
+    Serve the gzip-compressed version of a response's content, if the client accepts it.
 
-    Returns:
-        JSON response from the GitHub API.
+    Note:
+        The content is compressed once when it is cached, so that no compression happens while serving requests.
+        As the compressed content differs from the original one byte for byte, its ETag is made weak.
+
+    Args:
+        resp (flask.Response): The response to compress.
+        content_gzip (bytes): The gzip-compressed content of the response.
     """
-    file_path_to_serve = 'Entra roles/tiered-entra-roles.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
-    return resp
+    resp.vary.add('Accept-Encoding')
+
+    if request.accept_encodings.quality('gzip') > 0:
+        etag = resp.get_etag()[0]
 
+        if etag:
+            # Also applies to 304 responses, so that they carry the ETag of the representation cached by the client
+            resp.set_etag(etag, weak=True)
 
-@app.route('/api/entra/untiered-roles')
-def api_get_entra_untiered_roles():
+        if resp.status_code == 200:
+            resp.set_data(content_gzip)
+            resp.headers['Content-Encoding'] = 'gzip'
+
+
+
+# Routing functions ##########################################################################
+
+@app.after_request
+def add_cors_headers(resp):
     """
-    Get the untiered roles for Entra from the GitHub repository.
+    Allow the API to be called from any origin.
+
+    Note:
+        Preflight requests are answered by Flask without calling a route, and browsers may cache them for an hour.
+
+    Args:
+        resp (flask.Response): The response to a request.
 
     Returns:
-        JSON response from the GitHub API.
+        flask.Response: The response, with CORS headers for requests to the API.
     """
-    file_path_to_serve = 'Entra roles/untiered-entra-roles.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
+    if request.path.startswith('/api/'):
+        resp.headers['Access-Control-Allow-Origin'] = '*'
+
+        if request.method == 'OPTIONS':
+            resp.headers['Access-Control-Allow-Methods'] = 'GET'
+            resp.headers['Access-Control-Allow-Headers'] = 'If-None-Match'
+            resp.headers['Access-Control-Max-Age'] = '3600'
+
     return resp
 
 
-@app.route('/api/msgraph/tiered-permissions')
-def api_get_msgraph_tiered_permissions():
+@app.route('/healthz')
+def healthz():
     """
-    Get the tiered permissions for MS Graph from the GitHub repository.
+    Health check endpoint.
+    """
+    return 'ok', 200
+
+
+@app.route('/api/bundle')
+def api_get_bundle():
+    """
+    Get all served files from the GitHub repository in a single response.
 
     Returns:
-        JSON response from the GitHub API.
+        JSON object with the raw JSON content of each served file, by API path.
     """
-    file_path_to_serve = 'Microsoft Graph application permissions/tiered-msgraph-app-permissions.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
+    # Files still fresh in the cache are used as is, while expired ones are retrieved concurrently, as each of them needs a round-trip to GitHub
+    now = time.monotonic()
+    served_bundle_files = [served_file_cache.get(file_path) for file_path in served_files.values()]
+    expired_served_files = {file_path: served_file_executor.submit(get_file_from_github, file_path) for file_path, served_file in zip(served_files.values(), served_bundle_files) if not served_file or now - served_file['retrieved_at'] >= served_file_cache_ttl_seconds}
+
+    if expired_served_files:
+        served_bundle_files = [expired_served_files[file_path].result() if file_path in expired_served_files else served_file for file_path, served_file in zip(served_files.values(), served_bundle_files)]
+
+    # The raw content of each file is already JSON, so it is embedded as is rather than parsed and serialized again
+    bundle_content = b'{' + b','.join(json.dumps(resource).encode() + b':' + served_file['content'] for resource, served_file in zip(served_files, served_bundle_files)) + b'}'
+
+    resp = make_response(bundle_content)
+    resp.mimetype = 'application/json'
+    resp.headers['Cache-Control'] = 'max-age=60'
+
+    # Clients that already have the current version of the bundle get an empty 304 response
+    bundle_etag = hashlib.blake2b(bundle_content, digest_size=16).hexdigest()
+    resp.set_etag(bundle_etag)
+    resp.make_conditional(request)
+
+    # The bundle only changes when one of its files does, so it is compressed once per version (the cache may be cleared concurrently, so it is only read once)
+    bundle_content_gzip = served_bundle_gzip_cache.get(bundle_etag)
+
+    if bundle_content_gzip is None:
+        bundle_content_gzip = gzip.compress(bundle_content, compresslevel=6)
+        served_bundle_gzip_cache.clear()
+        served_bundle_gzip_cache[bundle_etag] = bundle_content_gzip
+
+    compress_response(resp, bundle_content_gzip)
     return resp
 
 
-@app.route('/api/msgraph/untiered-permissions')
-def api_get_msgraph_untiered_permissions():
+@app.route('/api/<path:resource>')
+def api_get_resource(resource):
     """
-    Get the untiered permissions for MS Graph from the GitHub repository.
+    Get one of the served files from the GitHub repository.
+
+    Args:
+        resource (str): The API path of the file to serve, as defined in served_files.
 
     Returns:
-        JSON response from the GitHub API.
+        Raw JSON content of the file, as returned by the GitHub API.
     """
-    file_path_to_serve = 'Microsoft Graph application permissions/untiered-msgraph-app-permissions.json'
-    token = app.config["GITHUB_PAT_TOKEN"]
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3.raw'
-    }
-    url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}/contents/{file_path_to_serve}'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    resp = make_response(jsonify(response.json()))
-    resp.headers['Access-Control-Allow-Origin'] = '*'
+    file_path_to_serve = served_files.get(resource)
+
+    if file_path_to_serve is None:
+        abort(404)
+
+    served_file = get_file_from_github(file_path_to_serve)
+
+    # The file is already JSON, so it is served as is rather than parsed and serialized again
+    resp = make_response(served_file['content'])
+    resp.mimetype = 'application/json'
+    resp.headers['Cache-Control'] = served_file['cache_control']
+
+    if served_file['etag']:
+        # Clients that already have the current version of the file get an empty 304 response
+        resp.headers['ETag'] = served_file['etag']
+        resp.make_conditional(request)
+
+    compress_response(resp, served_file['content_gzip'])
     return resp
 
 
 
 # Main #######################################################################################
 
-if __name__ == '__main__':
+def configure_app():
+    """
+    Configure the application from its environment, when it is loaded by the webserver.
+
+    Note:
+        In production, the application is served by Gunicorn, which loads this module once in each of its workers.
+        Each worker has therefore its own GitHub session, cache and background refresh.
+    """
     # Get Azure Workload Identity parameters 
     app.config['AZURE_TENANT_ID'] = os.environ["AZURE_TENANT_ID"]
     app.config['AZURE_CLIENT_ID'] = os.environ["AZURE_CLIENT_ID"]
@@ -248,13 +351,20 @@ if __name__ == '__main__':
     app.config['GITHUB_ORGANIZATION'] = os.environ['GITHUB_ORGANIZATION']
     app.config['GITHUB_REPOSITORY'] = os.environ['GITHUB_REPOSITORY']
 
-    # Get GitHub PAT token from Azure Key Vault
-    az_keyvault_secret_uri = os.environ['AZURE_KEY_VAULT_URL']
-    splitted_az_keyvault_secret_uri = az_keyvault_secret_uri.split('/secrets/')
-    az_keyvault_uri = splitted_az_keyvault_secret_uri[0]
-    az_keyvault_secret_name = splitted_az_keyvault_secret_uri[1]
-    github_pat_token = get_secret_from_key_vault(az_keyvault_uri, az_keyvault_secret_name)
-    app.config['GITHUB_PAT_TOKEN'] = github_pat_token
+    # Build the URL of each served file once, with spaces in file paths percent-encoded
+    github_repository_url = f'https://api.github.com/repos/{app.config["GITHUB_ORGANIZATION"]}/{app.config["GITHUB_REPOSITORY"]}'
+    github_file_urls.update({file_path: f'{github_repository_url}/contents/{quote(file_path)}' for file_path in served_files.values()})
+
+    # Authenticate all requests to GitHub with the PAT token stored in Azure Key Vault
+    app.config['AZURE_KEY_VAULT_URL'] = os.environ['AZURE_KEY_VAULT_URL']
+    authenticate_github_session()
+
+    # Keep served files up to date in the background
+    threading.Thread(target=refresh_served_files, daemon=True).start()
 
-    # Start the webserver
+
+configure_app()
+
+if __name__ == '__main__':
+    # Start the development webserver (in production, the application is served by Gunicorn)
     app.run(host='0.0.0.0', port=5000)